@@ -0,0 +1,79 @@
+"""Compares detecting text on synthetic video frames with subtitles at the
+max height against the adaptive detection scale. Reports the detection
+time per frame, the average scale and the text lines found.
+
+Falls back to small stand-in models if the networks in data/ are missing,
+in which case the found lines are not meaningful.
+
+Run from the repository root with `python -m benchmarks.adaptive_detection`."""
+import contextlib
+import io
+import os
+import random
+import string
+import tempfile
+from time import perf_counter
+
+import click
+import cv2
+import numpy as np
+
+from ocr.detection.cptn import CPTNDetector
+from ocr.detection.adaptive import AdaptiveScaleDetector
+from benchmarks.standin import make_stand_in_models
+
+
+def make_subtitle_frame(rng, width, height, text_height):
+    """Returns a synthetic gray frame with one or two subtitle lines
+    of text_height pixels in the bottom fifth."""
+    frame = np.full((height, width, 3), 96, np.uint8)
+    scale = cv2.getFontScaleFromHeight(cv2.FONT_HERSHEY_SIMPLEX, text_height, 3)
+    for line in range(rng.randint(1, 2)):
+        text = "".join(rng.choice(string.ascii_letters) for _ in range(rng.randint(10, 30)))
+        y = int(height * 0.85) + line * int(text_height * 1.6)
+        cv2.putText(frame, text, (width // 5, y), cv2.FONT_HERSHEY_SIMPLEX, scale, (255, 255, 255), 3)
+    return frame
+
+
+@click.command()
+@click.option("--detector-model-path", type=click.Path(dir_okay=False), default=os.path.join("data", "cptn.onnx"))
+@click.option("--alphabet-path", type=click.Path(exists=True, dir_okay=False), default=os.path.join("data", "alphabet.pkl"))
+@click.option("--execution-providers", multiple=True, default=["CPUExecutionProvider"])
+@click.option("--resolution", type=(int, int), default=(2560, 1440))
+@click.option("--text-heights", multiple=True, type=click.INT, default=[24, 48, 72])
+@click.option("--target-height", type=click.INT, default=24)
+@click.option("--frames", type=click.INT, default=20)
+def main(detector_model_path, alphabet_path, execution_providers, resolution, text_heights, target_height, frames):
+    if not os.path.exists(detector_model_path):
+        print("Using stand-in models")
+        detector_model_path, _ = make_stand_in_models(
+            os.path.join(tempfile.gettempdir(), "chinese-overlay-stand-in"), alphabet_path)
+
+    detector = CPTNDetector(detector_model_path, execution_providers)
+    width, height = resolution
+
+    print("%-12s %-10s %12s %8s %8s" % ("text height", "mode", "time (ms)", "scale", "lines"))
+    for text_height in text_heights:
+        rng = random.Random(0)
+        video = [make_subtitle_frame(rng, width, height, text_height) for _ in range(frames)]
+
+        for mode in ["fixed", "adaptive"]:
+            adaptive = AdaptiveScaleDetector(detector, target_height)
+            scales, lines = [], 0
+            start = perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                for frame in video:
+                    if mode == "fixed":
+                        text, _, _ = detector.detect(frame)
+                        scales.append(1)
+                    else:
+                        scales.append(adaptive.detection_scale(frame.shape))
+                        text, _, _ = adaptive.detect(frame)
+                    lines += len(text)
+            seconds = (perf_counter() - start) / frames
+            print("%-12d %-10s %12.1f %8.2f %8.1f" % (
+                text_height, mode, seconds * 1000, np.mean(scales), lines / frames))
+
+
+if __name__ == "__main__":
+    main()
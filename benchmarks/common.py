@@ -0,0 +1,64 @@
+"""Helpers shared by the benchmarks."""
+import glob
+import os
+import string
+from time import perf_counter
+
+import cv2
+import numpy as np
+
+
+def time_fn(fn, repeats):
+    """Returns the median time in seconds of calling fn."""
+    times = []
+    for _ in range(repeats):
+        start = perf_counter()
+        fn()
+        times.append(perf_counter() - start)
+    return float(np.median(times))
+
+
+def load_screenshots(pattern=os.path.join("screenshots", "*.jpg"), max_height=None):
+    """Returns (file name, RGB image) of the images matching the pattern,
+    downscaled to max_height if they are higher."""
+    from ocr.detection.utils import resize
+
+    screenshots = []
+    for path in sorted(glob.glob(pattern)):
+        image = np.ascontiguousarray(cv2.imread(path)[:, :, ::-1])
+        if max_height is not None and image.shape[0] > max_height:
+            image = resize(image, height=max_height)
+        screenshots.append((os.path.basename(path), image))
+    return screenshots
+
+
+def make_text_image(rng, width, height, line_count):
+    """Returns a synthetic white image of the given size
+    with line_count black text lines spread over it."""
+    image = np.full((height, width, 3), 255, np.uint8)
+    line_height = height / max(1, line_count)
+    scale = max(0.3, min(1.5, line_height / 40))
+    for line in range(line_count):
+        text = "".join(rng.choice(string.ascii_letters + string.digits) for _ in range(rng.randint(6, 30)))
+        x = rng.randint(0, max(1, width // 4))
+        y = int((line + 0.75) * line_height)
+        cv2.putText(image, text, (x, y), cv2.FONT_HERSHEY_SIMPLEX, scale, (0, 0, 0), 2)
+    return image
+
+
+def edit_distance(a, b):
+    """Returns the Levenshtein distance between two strings."""
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        previous = current
+    return previous[-1]
+
+
+def character_error_rate(references, hypotheses):
+    """Returns the edit distance of all hypotheses to their references
+    relative to the number of reference characters."""
+    errors = sum(edit_distance(ref, hyp) for ref, hyp in zip(references, hypotheses))
+    return errors / max(1, sum(len(ref) for ref in references))
@@ -0,0 +1,95 @@
+"""Micro-benchmark for the detection post-processing that turns the
+detector network outputs into text lines. Compares against the
+previous dense decoding of every anchor and checks that the results
+are identical.
+
+Run from the repository root with `python -m benchmarks.detection`."""
+import os
+
+import click
+import numpy as np
+
+from ocr.detection.cptn import CPTNDetector
+from ocr.detection.nms import nms
+from ocr.detection.utils import bbox_transfor_inv, clip_box, filter_bbox, \
+    TextProposalConnectorOriented, softmax
+from benchmarks.common import time_fn
+
+ANCHORS_PER_POSITION = 10
+
+
+def legacy_gen_anchor(featuresize, scale):
+    """Previous uncached anchor grid generation using a Python loop."""
+    heights = np.array([11, 16, 23, 33, 48, 68, 97, 139, 198, 283]).reshape(-1, 1)
+    widths = np.full((len(heights), 1), 16)
+    xt = yt = 7.5
+    base_anchor = np.hstack((xt - widths * 0.5, yt - heights * 0.5,
+                             xt + widths * 0.5, yt + heights * 0.5))
+    h, w = featuresize
+    anchor = []
+    for i in np.arange(0, h) * scale:
+        for j in np.arange(0, w) * scale:
+            anchor.append(base_anchor + [j, i, j, i])
+    return np.array(anchor).reshape((-1, 4))
+
+
+def legacy_postprocess(cls, regr, h, w, prob_thresh):
+    """Previous post-processing that decodes the boxes of all anchors."""
+    cls_prob = softmax(cls, axis=-1)
+    anchor = legacy_gen_anchor((int(h / 16), int(w / 16)), 16)
+    bbox = bbox_transfor_inv(anchor, regr)
+    bbox = clip_box(bbox, [h, w])
+    fg = np.where(cls_prob[0, :, 1] > prob_thresh)[0]
+    select_anchor = bbox[fg, :].astype(np.int32)
+    select_score = cls_prob[0, fg, 1]
+    keep_index = filter_bbox(select_anchor, 16)
+    select_anchor = select_anchor[keep_index]
+    select_score = select_score[keep_index].reshape(-1, 1)
+    keep = nms(np.hstack((select_anchor, select_score)), 0.3)
+    return TextProposalConnectorOriented().get_text_lines(
+        select_anchor[keep], select_score[keep], [h, w])
+
+
+def make_outputs(rng, h, w, foreground_ratio):
+    """Returns synthetic detector outputs for an image of size (h, w)
+    with roughly the given ratio of foreground anchors."""
+    count = int(h / 16) * int(w / 16) * ANCHORS_PER_POSITION
+    cls = rng.randn(1, count, 2).astype(np.float32)
+    foreground = rng.rand(count) < foreground_ratio
+    cls[0, foreground, 1] += 6
+    cls[0, ~foreground, 0] += 6
+    regr = (rng.randn(1, count, 2) * 0.1).astype(np.float32)
+    return cls, regr
+
+
+@click.command()
+@click.option("--detector-model-path", type=click.Path(exists=True, dir_okay=False), default=os.path.join("data", "cptn.onnx"))
+@click.option("--execution-providers", multiple=True, default=["CPUExecutionProvider"])
+@click.option("--resolutions", multiple=True, default=["1280x720", "1920x1080", "2560x1440"])
+@click.option("--foreground-ratio", type=click.FLOAT, default=0.002)
+@click.option("--repeats", type=click.INT, default=5)
+def main(detector_model_path, execution_providers, resolutions, foreground_ratio, repeats):
+    detector = CPTNDetector(detector_model_path, execution_providers)
+    rng = np.random.RandomState(0)
+
+    print("%12s %10s %12s %12s %8s" % (
+        "resolution", "anchors", "legacy (ms)", "current (ms)", "speedup"))
+    for resolution in resolutions:
+        w, h = [int(x) for x in resolution.split("x")]
+        cls, regr = make_outputs(rng, h, w, foreground_ratio)
+
+        expected = legacy_postprocess(cls, regr, h, w, detector.prob_thresh)
+        actual = detector.postprocess(cls, regr, h, w, expand=False)
+        assert np.array_equal(expected, actual), "Post-processing results differ"
+
+        legacy = time_fn(lambda: legacy_postprocess(
+            cls, regr, h, w, detector.prob_thresh), repeats)
+        current = time_fn(lambda: detector.postprocess(
+            cls, regr, h, w, expand=False), repeats)
+
+        print("%12s %10d %12.2f %12.2f %7.2fx" % (
+            resolution, cls.shape[1], legacy * 1000, current * 1000, legacy / current))
+
+
+if __name__ == "__main__":
+    main()
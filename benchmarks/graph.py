@@ -0,0 +1,192 @@
+"""Regression check and benchmark for grouping text proposals into
+text lines. Compares the groupings of TextProposalGraphBuilder against
+the previous implementation that scanned pixel columns in Python and
+stored the graph as a dense matrix.
+
+The proposals recorded from CPTNDetector.postprocess on the screenshots
+in benchmarks/data, the proposals of synthetic images and synthetic
+proposals are checked by default. Other .npz files with `text_proposals`,
+`scores` and `im_size` arrays can be given with --recorded. Record the
+screenshots again with `python -m benchmarks.proposals`.
+
+`--check-only` only checks the groupings and exits with status 1 if any
+differ, so that it can run as a regression test.
+
+Run from the repository root with `python -m benchmarks.graph`."""
+import glob
+import os
+import random
+import sys
+from time import perf_counter
+
+import click
+import numpy as np
+
+from ocr.detection.utils import TextLineCfg, TextProposalGraphBuilder
+from benchmarks.common import make_text_image
+from benchmarks.proposals import RECORDED_DIR, detect_proposals, make_detector
+
+
+class LegacyTextProposalGraphBuilder:
+    """Previous graph builder kept as a reference."""
+
+    def get_successions(self, index):
+        box = self.text_proposals[index]
+        results = []
+        for left in range(int(box[0]) + 1, min(int(box[0]) + TextLineCfg.MAX_HORIZONTAL_GAP + 1, self.im_size[1])):
+            for adj_box_index in self.boxes_table[left]:
+                if self.meet_v_iou(adj_box_index, index):
+                    results.append(adj_box_index)
+            if len(results) != 0:
+                return results
+        return results
+
+    def get_precursors(self, index):
+        box = self.text_proposals[index]
+        results = []
+        for left in range(int(box[0]) - 1, max(int(box[0] - TextLineCfg.MAX_HORIZONTAL_GAP), 0) - 1, -1):
+            for adj_box_index in self.boxes_table[left]:
+                if self.meet_v_iou(adj_box_index, index):
+                    results.append(adj_box_index)
+            if len(results) != 0:
+                return results
+        return results
+
+    def meet_v_iou(self, index1, index2):
+        h1 = self.heights[index1]
+        h2 = self.heights[index2]
+        y0 = max(self.text_proposals[index2][1], self.text_proposals[index1][1])
+        y1 = min(self.text_proposals[index2][3], self.text_proposals[index1][3])
+        return max(0, y1 - y0 + 1) / min(h1, h2) >= TextLineCfg.MIN_V_OVERLAPS and \
+            min(h1, h2) / max(h1, h2) >= TextLineCfg.MIN_SIZE_SIM
+
+    def group_text_proposals(self, text_proposals, scores, im_size):
+        self.text_proposals = text_proposals
+        self.im_size = im_size
+        self.heights = text_proposals[:, 3] - text_proposals[:, 1] + 1
+
+        self.boxes_table = [[] for _ in range(im_size[1])]
+        for index, box in enumerate(text_proposals):
+            self.boxes_table[int(box[0])].append(index)
+
+        n = text_proposals.shape[0]
+        graph = np.zeros((n, n), bool)
+        for index in range(n):
+            successions = self.get_successions(index)
+            if len(successions) == 0:
+                continue
+            succession_index = successions[np.argmax(scores[successions])]
+            precursors = self.get_precursors(succession_index)
+            if scores[index] >= np.max(scores[precursors]):
+                graph[index, succession_index] = True
+
+        sub_graphs = []
+        for index in range(n):
+            if not graph[:, index].any() and graph[index, :].any():
+                v = index
+                sub_graphs.append([v])
+                while graph[v, :].any():
+                    v = np.where(graph[v, :])[0][0]
+                    sub_graphs[-1].append(v)
+        return sub_graphs
+
+
+def make_proposals(rng, count, im_size):
+    """Returns synthetic text proposals, mostly arranged in horizontal
+    lines of 16 pixel wide boxes with some random clutter."""
+    h, w = im_size
+    boxes = []
+    while len(boxes) < count * 0.8:
+        height = rng.randint(16, 60)
+        y = rng.randint(0, h - height)
+        x = rng.randint(0, w // 2)
+        for _ in range(rng.randint(2, 60)):
+            x += int(rng.choice([16, 16, 16, 8, 32, 80]))
+            if x + 15 >= w:
+                break
+            dy = rng.randint(-3, 4)
+            boxes.append([x, max(0, y + dy), x + 15, min(h - 1, y + dy + height)])
+    while len(boxes) < count:
+        height = rng.randint(16, 120)
+        x, y = rng.randint(0, w - 16), rng.randint(0, h - height)
+        boxes.append([x, y, x + 15, y + height])
+    boxes = np.array(boxes[:count], np.int32)
+    scores = np.round(rng.uniform(0.5, 1.0, (count, 1)), 2).astype(np.float32)
+    return boxes, scores
+
+
+def load_inputs(recorded, resolutions, line_count, alphabet_path, execution_providers):
+    """Returns (name, text_proposals, scores, im_size) of the recorded
+    proposals and of the proposals of synthetic images."""
+    inputs = []
+    for path in recorded:
+        data = np.load(path)
+        inputs.append((os.path.basename(path), data["text_proposals"], data["scores"], tuple(data["im_size"])))
+
+    # Only the post-processing of the detector is used
+    detector, _ = make_detector("", alphabet_path, execution_providers)
+    for width, height in resolutions:
+        image = make_text_image(random.Random(0), width, height, line_count)
+        _, (text_proposals, scores, im_size) = detect_proposals(detector, image, np.random.RandomState(0))
+        inputs.append(("%dx%d" % (width, height), text_proposals, scores, im_size))
+    return inputs
+
+
+def check(name, text_proposals, scores, im_size, timed=True):
+    """Returns whether the current graph builder groups the proposals like
+    the previous one and prints the timings of both if timed."""
+    start = perf_counter()
+    expected = LegacyTextProposalGraphBuilder().group_text_proposals(
+        text_proposals, scores, im_size)
+    legacy = perf_counter() - start
+
+    start = perf_counter()
+    actual = TextProposalGraphBuilder().build_graph(
+        text_proposals, scores, im_size).sub_graphs_connected()
+    current = perf_counter() - start
+
+    equal = [list(map(int, g)) for g in expected] == [list(map(int, g)) for g in actual]
+    if not equal:
+        print("Line groupings differ for %s" % name)
+    elif timed:
+        print("%20s %10d %8d %12.2f %12.2f %7.2fx" % (
+            name, len(text_proposals), len(actual), legacy * 1000, current * 1000, legacy / current))
+    return equal
+
+
+@click.command()
+@click.option("--proposal-counts", multiple=True, type=click.INT, default=[100, 500, 2000, 5000])
+@click.option("--recorded", multiple=True, type=click.Path(exists=True, dir_okay=False),
+              help="Recorded proposals as .npz files with text_proposals, scores and im_size. "
+                   "Defaults to the recordings in benchmarks/data.")
+@click.option("--resolutions", multiple=True, type=(int, int), default=[(1280, 720), (1920, 1080), (2560, 1440)])
+@click.option("--line-count", type=click.INT, default=20)
+@click.option("--seeds", type=click.INT, default=3)
+@click.option("--check-only", is_flag=True,
+              help="Only checks the groupings without timing them. Exits with status 1 if any differ.")
+@click.option("--alphabet-path", type=click.Path(exists=True, dir_okay=False), default=os.path.join("data", "alphabet.pkl"))
+@click.option("--execution-providers", multiple=True, default=["CPUExecutionProvider"])
+def main(proposal_counts, recorded, resolutions, line_count, seeds, check_only, alphabet_path, execution_providers):
+    if len(recorded) == 0:
+        recorded = sorted(glob.glob(os.path.join(RECORDED_DIR, "proposals-*.npz")))
+    inputs = load_inputs(recorded, resolutions, line_count, alphabet_path, execution_providers)
+
+    im_size = (1440, 2560)
+    for count in proposal_counts:
+        for seed in range(seeds):
+            text_proposals, scores = make_proposals(np.random.RandomState(seed), count, im_size)
+            inputs.append(("synthetic-%d-%d" % (count, seed), text_proposals, scores, im_size))
+
+    if not check_only:
+        print("%20s %10s %8s %12s %12s %8s" % (
+            "input", "proposals", "lines", "legacy (ms)", "current (ms)", "speedup"))
+
+    failed = [name for name, *proposals in inputs if not check(name, *proposals, timed=not check_only)]
+    if len(failed) > 0:
+        sys.exit(1)
+    if check_only:
+        print("Line groupings of %d inputs are identical" % len(inputs))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Compares running the networks with and without IO binding on the
+screenshots. Reports the time and the peak of the memory allocated by
+Python objects such as numpy arrays per call of the detector and of the
+batched recognizer on the detected lines.
+
+Falls back to small stand-in models if the networks in data/ are missing.
+
+Run from the repository root with `python -m benchmarks.io_binding`."""
+import contextlib
+import io
+import os
+import tempfile
+import tracemalloc
+
+import click
+
+from ocr.ocr import make_default_ocr
+from benchmarks.common import time_fn, load_screenshots
+from benchmarks.standin import make_stand_in_models
+
+
+def peak_allocation(fn):
+    """Returns the peak of the memory in bytes allocated while calling fn."""
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+@click.command()
+@click.option("--detector-model-path", type=click.Path(dir_okay=False), default=os.path.join("data", "cptn.onnx"))
+@click.option("--recognizer-model-path", type=click.Path(dir_okay=False), default=os.path.join("data", "crnn.onnx"))
+@click.option("--alphabet-path", type=click.Path(exists=True, dir_okay=False), default=os.path.join("data", "alphabet.pkl"))
+@click.option("--execution-providers", multiple=True, default=["CPUExecutionProvider"])
+@click.option("--max-height", type=click.INT, default=1000)
+@click.option("--repeats", type=click.INT, default=5)
+def main(detector_model_path, recognizer_model_path, alphabet_path, execution_providers, max_height, repeats):
+    if not (os.path.exists(detector_model_path) and os.path.exists(recognizer_model_path)):
+        print("Using stand-in models")
+        detector_model_path, recognizer_model_path = make_stand_in_models(
+            os.path.join(tempfile.gettempdir(), "chinese-overlay-stand-in"), alphabet_path)
+
+    images = [image for _, image in load_screenshots(max_height=max_height)]
+
+    print("%-12s %-10s %12s %16s" % ("network", "io binding", "time (ms)", "peak alloc (MB)"))
+    for io_binding in [False, True]:
+        ocr = make_default_ocr(detector_model_path, recognizer_model_path, alphabet_path, execution_providers,
+                               io_binding=io_binding)
+        with contextlib.redirect_stdout(io.StringIO()):
+            lines = [ocr._crop_lines(image, ocr.detect(image))[0] for image in images]
+
+        calls = {
+            "detector": lambda: [ocr.detector.detect(image) for image in images],
+            "recognizer": lambda: [ocr.recognizer.recognize_batch(image_lines) for image_lines in lines],
+        }
+        for network, fn in calls.items():
+            # The buffers are allocated on the first call of every shape
+            fn()
+            seconds = time_fn(fn, repeats)
+            allocated = peak_allocation(fn)
+            print("%-12s %-10s %12.1f %16.2f" % (network, io_binding, seconds * 1000, allocated / 1024 / 1024))
+
+
+if __name__ == "__main__":
+    main()
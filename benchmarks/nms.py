@@ -0,0 +1,72 @@
+"""Benchmarks the non-maximum suppression backends on the boxes that
+CPTNDetector.postprocess passes to NMS and checks that they keep the same
+boxes as the loop backend.
+
+The boxes recorded on the screenshots in benchmarks/data are used by
+default; record them again with `python -m benchmarks.proposals`. Boxes of
+synthetic images are added for larger resolutions, with the detector
+outputs synthesized from their text lines.
+
+Run from the repository root with `python -m benchmarks.nms`."""
+import glob
+import os
+import random
+
+import click
+import numpy as np
+
+from ocr.detection.nms import nms, NMS_BACKENDS
+from benchmarks.common import time_fn, make_text_image
+from benchmarks.proposals import RECORDED_DIR, detect_proposals, make_detector
+
+
+def load_inputs(recorded, resolutions, line_count, alphabet_path, execution_providers):
+    """Returns (name, boxes) of the recorded boxes and of synthetic images."""
+    inputs = [(os.path.basename(path), np.load(path)["dets"]) for path in recorded]
+
+    # Only the post-processing of the detector is used
+    detector, _ = make_detector("", alphabet_path, execution_providers)
+    for width, height in resolutions:
+        image = make_text_image(random.Random(0), width, height, line_count)
+        dets, _ = detect_proposals(detector, image, np.random.RandomState(0))
+        inputs.append(("%dx%d" % (width, height), dets))
+    return inputs
+
+
+@click.command()
+@click.option("--recorded", multiple=True, type=click.Path(exists=True, dir_okay=False),
+              help="Recorded boxes as .npz files with a dets array. Defaults to the recordings in benchmarks/data.")
+@click.option("--resolutions", multiple=True, type=(int, int), default=[(1280, 720), (1920, 1080), (2560, 1440)])
+@click.option("--line-count", type=click.INT, default=20)
+@click.option("--alphabet-path", type=click.Path(exists=True, dir_okay=False), default=os.path.join("data", "alphabet.pkl"))
+@click.option("--execution-providers", multiple=True, default=["CPUExecutionProvider"])
+@click.option("--thresh", type=click.FLOAT, default=0.3)
+@click.option("--max-matrix-boxes", type=click.INT, default=5000)
+@click.option("--repeats", type=click.INT, default=3)
+def main(recorded, resolutions, line_count, alphabet_path, execution_providers, thresh, max_matrix_boxes, repeats):
+    if len(recorded) == 0:
+        recorded = sorted(glob.glob(os.path.join(RECORDED_DIR, "nms-*.npz")))
+    inputs = load_inputs(recorded, resolutions, line_count, alphabet_path, execution_providers)
+
+    backends = list(NMS_BACKENDS) + ["auto"]
+    print("%16s %8s %6s" % ("input", "boxes", "kept") + "".join("%14s" % ("%s (ms)" % b) for b in backends))
+    for name, dets in inputs:
+        expected = nms(dets, thresh, "loop")
+
+        times = []
+        for backend in backends:
+            # The iou matrix does not fit into memory for many boxes
+            if backend == "matrix" and len(dets) > max_matrix_boxes:
+                times.append(float("nan"))
+                continue
+            keep = nms(dets, thresh, backend)
+            # OpenCV visits boxes with equal scores in another order so it may keep other boxes
+            if backend != "opencv":
+                assert np.array_equal(keep, expected), "Kept boxes differ for %s on %s" % (backend, name)
+            times.append(time_fn(lambda: nms(dets, thresh, backend), repeats))
+
+        print("%16s %8d %6d" % (name, len(dets), len(expected)) + "".join("%14.2f" % (t * 1000) for t in times))
+
+
+if __name__ == "__main__":
+    main()
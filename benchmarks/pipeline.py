@@ -0,0 +1,219 @@
+"""Benchmarks every stage of the OCR and translation pipeline and the
+whole pipeline on the screenshots and on synthetic images with a given
+number of text lines and resolution. Reports latency percentiles,
+throughput and peak memory and optionally compares them to a saved
+baseline.
+
+Falls back to small stand-in models if the networks in data/ are missing
+so the relative timings of the post-processing and translation code can
+be measured anywhere.
+
+Run from the repository root with `python -m benchmarks.pipeline`."""
+import asyncio
+import contextlib
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+import tracemalloc
+from time import perf_counter
+
+import click
+import numpy as np
+
+from ocr import make_default_ocr
+from ocr.ocr import sort_box
+from translation import get_pinyin, get_all_phrase_translations, get_sentence_translation, use_cedict_index
+from benchmarks.common import load_screenshots, make_text_image
+from benchmarks.standin import make_stand_in_models
+
+# Sentences used for the translation stages as the stand-in models do not recognize real text
+SENTENCES = [
+    "我们今天晚上去吃饭吧",
+    "这个问题很难回答",
+    "欢迎来到直播间",
+    "他说明天会下雨",
+    "谢谢大家的支持",
+]
+
+
+def load_inputs(resolutions, line_counts, seed):
+    """Returns (name, image) of the screenshots and the synthetic images."""
+    inputs = load_screenshots()
+
+    rng = random.Random(seed)
+    for width, height in resolutions:
+        for line_count in line_counts:
+            inputs.append(("%dx%d-%dlines" % (width, height, line_count),
+                           make_text_image(rng, width, height, line_count)))
+
+    return inputs
+
+
+def measure(fn, repeats, items=1):
+    """Calls fn once to warm up and then repeats times. Returns the latency
+    percentiles in ms, the throughput in items per second and the peak
+    traced memory in MB of an additional call."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        fn()
+        times = []
+        for _ in range(repeats):
+            start = perf_counter()
+            fn()
+            times.append(perf_counter() - start)
+
+        tracemalloc.start()
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    p50, p90, p99 = np.percentile(times, [50, 90, 99]) * 1000
+    return {
+        "items": items,
+        "p50_ms": float(p50),
+        "p90_ms": float(p90),
+        "p99_ms": float(p99),
+        "items_per_s": float(items * len(times) / sum(times)),
+        "peak_mb": peak / (1024 * 1024),
+    }
+
+
+def max_rss_mb():
+    """Returns the peak resident memory of the process in MB or None if unknown."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Reported in bytes on macOS and in KB elsewhere
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def run_stages(ocr, inputs, max_height, repeats):
+    """Yields (stage, input name, measurement) of every stage for every input."""
+    from cli import get_ocr_results
+
+    detector, recognizer = ocr.detector, ocr.recognizer
+
+    for name, image in inputs:
+        h, w = image.shape[:2]
+        yield "detect", name, measure(lambda: detector.detect(image), repeats)
+
+        cls, regr = detector.session.run(None, {"images": np.expand_dims(detector.preprocess(image), 0)})
+        yield "detect_postprocess", name, measure(lambda: detector.postprocess(cls, regr, h, w), repeats)
+
+        text_recs = sort_box(detector.detect(image)[0])
+        line_count = max(1, len(text_recs))
+        yield "char_rec", name, measure(lambda: ocr._char_rec(image, text_recs), repeats, line_count)
+
+        part_imgs, _ = ocr._crop_lines(image, text_recs)
+        if len(part_imgs) > 0:
+            yield "recognize", name, measure(
+                lambda: [recognizer.recognize(part_img) for part_img in part_imgs], repeats, len(part_imgs))
+
+        yield "end_to_end", name, measure(
+            lambda: asyncio.run(get_ocr_results(ocr, image, max_height)), repeats)
+
+    sentences = len(SENTENCES)
+    yield "pinyin", "sentences", measure(lambda: [get_pinyin(text) for text in SENTENCES], repeats, sentences)
+    yield "phrase_translations", "sentences", measure(
+        lambda: [list(get_all_phrase_translations(text)) for text in SENTENCES], repeats, sentences)
+    yield "sentence_translation", "sentences", measure(
+        lambda: [get_sentence_translation(text) for text in SENTENCES], repeats, sentences)
+
+
+def compare(results, baseline, tolerance):
+    """Prints the change of the median latency against the baseline
+    and returns the number of regressions beyond the tolerance."""
+    regressions = 0
+    print()
+    print("%-22s %-24s %12s %12s %9s" % ("stage", "input", "base (ms)", "now (ms)", "change"))
+    for key, result in results.items():
+        if key not in baseline:
+            continue
+        stage, name = key.split("/", 1)
+        before, after = baseline[key]["p50_ms"], result["p50_ms"]
+        change = after / before - 1 if before > 0 else 0
+        regressed = change > tolerance
+        regressions += regressed
+        print("%-22s %-24s %12.2f %12.2f %+8.1f%%%s" % (
+            stage, name, before, after, change * 100, "  REGRESSION" if regressed else ""))
+    return regressions
+
+
+def parse_resolution(ctx, param, values):
+    try:
+        return [tuple(int(v) for v in value.lower().split("x")) for value in values]
+    except ValueError:
+        raise click.BadParameter("Resolutions are given as WIDTHxHEIGHT")
+
+
+@click.command()
+@click.option("--detector-model-path", type=click.Path(dir_okay=False), default=os.path.join("data", "cptn.onnx"))
+@click.option("--recognizer-model-path", type=click.Path(dir_okay=False), default=os.path.join("data", "crnn.onnx"))
+@click.option("--alphabet-path", type=click.Path(exists=True, dir_okay=False), default=os.path.join("data", "alphabet.pkl"))
+@click.option("--cedict-index-path", type=click.Path(dir_okay=False), default=os.path.join("data", "cedict.idx"))
+@click.option("--execution-providers", multiple=True, default=["CPUExecutionProvider"])
+@click.option("--stand-in/--no-stand-in", default=None,
+              help="Whether to use stand-in models. Used by default if the models do not exist.")
+@click.option("--resolutions", multiple=True, default=["1280x720", "1920x1080"], callback=parse_resolution,
+              help="Resolutions of the synthetic images as WIDTHxHEIGHT.")
+@click.option("--line-counts", multiple=True, type=click.INT, default=[5, 20],
+              help="Number of text lines of the synthetic images.")
+@click.option("--max-height", type=click.INT, default=1000)
+@click.option("--repeats", type=click.INT, default=10)
+@click.option("--seed", type=click.INT, default=0)
+@click.option("--save-baseline", type=click.Path(dir_okay=False), default=None,
+              help="File to save the results to as a baseline for later runs.")
+@click.option("--baseline", type=click.Path(exists=True, dir_okay=False), default=None,
+              help="Baseline file to compare the results to.")
+@click.option("--tolerance", type=click.FLOAT, default=0.1,
+              help="Relative increase of the median latency over the baseline that counts as a regression.")
+def main(detector_model_path, recognizer_model_path, alphabet_path, cedict_index_path, execution_providers,
+         stand_in, resolutions, line_counts, max_height, repeats, seed, save_baseline, baseline, tolerance):
+    if stand_in is None:
+        stand_in = not (os.path.exists(detector_model_path) and os.path.exists(recognizer_model_path))
+    if stand_in:
+        print("Using stand-in models")
+        detector_model_path, recognizer_model_path = make_stand_in_models(
+            os.path.join(tempfile.gettempdir(), "chinese-overlay-stand-in"), alphabet_path, seed)
+
+    use_cedict_index(cedict_index_path)
+
+    # Batched recognition is disabled so that recognize and char_rec measure the same path
+    ocr = make_default_ocr(detector_model_path, recognizer_model_path, alphabet_path, execution_providers)
+    ocr.batch_recognition = False
+
+    results = {}
+    print("%-22s %-24s %6s %9s %9s %9s %11s %9s" % (
+        "stage", "input", "items", "p50 (ms)", "p90 (ms)", "p99 (ms)", "items/s", "peak (MB)"))
+    for stage, name, result in run_stages(ocr, load_inputs(resolutions, line_counts, seed), max_height, repeats):
+        results["%s/%s" % (stage, name)] = result
+        print("%-22s %-24s %6d %9.2f %9.2f %9.2f %11.1f %9.1f" % (
+            stage, name, result["items"], result["p50_ms"], result["p90_ms"], result["p99_ms"],
+            result["items_per_s"], result["peak_mb"]))
+
+    rss = max_rss_mb()
+    if rss is not None:
+        print("Peak resident memory: %.1f MB" % rss)
+
+    if save_baseline is not None:
+        with open(save_baseline, "w") as f:
+            json.dump({"stand_in": stand_in, "results": results}, f, indent=2)
+        print("Saved baseline to", save_baseline)
+
+    if baseline is not None:
+        with open(baseline) as f:
+            baseline = json.load(f)
+        if baseline["stand_in"] != stand_in:
+            print("The baseline was measured with %s models" % ("stand-in" if baseline["stand_in"] else "real"))
+        regressions = compare(results, baseline["results"], tolerance)
+        if regressions > 0:
+            print("%d regressions" % regressions)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""Records the boxes that CPTNDetector.postprocess passes to NMS and the
+text proposals it groups into lines on the screenshots, so that the NMS
+and graph benchmarks run on real detector proposals.
+
+Without data/cptn.onnx the network outputs are synthesized from the text
+lines found in the images instead, like the trained network predicts them:
+the anchors of every 16 pixel column of a text line that overlap the line
+vertically are foreground and regress to the line. This gives the stacked,
+heavily overlapping proposals of the real detector rather than the
+scattered ones of the stand-in detector.
+
+Run from the repository root with `python -m benchmarks.proposals`."""
+import contextlib
+import io
+import os
+import tempfile
+
+import click
+import cv2
+import numpy as np
+
+from ocr.detection import cptn
+from ocr.detection.utils import gen_anchor, TextProposalConnectorOriented
+from benchmarks.common import load_screenshots
+from benchmarks.standin import make_stand_in_models
+
+RECORDED_DIR = os.path.join(os.path.dirname(__file__), "data")
+
+
+def find_text_lines(image, min_height=6, max_height=80):
+    """Returns boxes (x1, y1, x2, y2) around the text lines of an RGB
+    image, found as wide regions of dense edges."""
+    gray = cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
+    edges = cv2.morphologyEx(gray, cv2.MORPH_GRADIENT, np.ones((3, 3), np.uint8))
+    _, edges = cv2.threshold(edges, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)
+    # Removes long straight edges such as borders that would connect the lines they surround
+    borders = cv2.morphologyEx(edges, cv2.MORPH_OPEN, cv2.getStructuringElement(cv2.MORPH_RECT, (40, 1))) | \
+        cv2.morphologyEx(edges, cv2.MORPH_OPEN, cv2.getStructuringElement(cv2.MORPH_RECT, (1, 40)))
+    edges &= ~borders
+    # Joins the characters of a line but not the lines above and below
+    edges = cv2.morphologyEx(edges, cv2.MORPH_CLOSE, cv2.getStructuringElement(cv2.MORPH_RECT, (9, 1)))
+    _, _, stats, _ = cv2.connectedComponentsWithStats(edges)
+
+    lines = []
+    for x, y, w, h, area in stats[1:]:
+        if min_height <= h <= max_height and w >= 2 * h and area >= 0.4 * w * h:
+            lines.append((x, y, x + w - 1, y + h - 1))
+    return np.array(lines, np.int64).reshape(-1, 4)
+
+
+def make_outputs(rng, lines, h, w, min_v_iou=0.5, noise=0.05):
+    """Returns detector outputs (cls, regr) for an image of size (h, w)
+    that detect the text lines. Anchors of the columns of a line whose
+    vertical iou with the line exceeds min_v_iou are foreground and
+    regress to the line with some noise."""
+    anchor = gen_anchor((int(h / 16), int(w / 16)), 16)
+    anchor_cx = (anchor[:, 0] + anchor[:, 2]) * 0.5
+    anchor_cy = (anchor[:, 1] + anchor[:, 3]) * 0.5
+    anchor_h = anchor[:, 3] - anchor[:, 1] + 1
+
+    cls = rng.randn(1, len(anchor), 2).astype(np.float32)
+    cls[0, :, 0] += 6
+    regr = (rng.randn(1, len(anchor), 2) * noise).astype(np.float32)
+    for x1, y1, x2, y2 in lines:
+        line_h = y2 - y1 + 1
+        overlap = np.maximum(0, np.minimum(anchor[:, 3], y2) - np.maximum(anchor[:, 1], y1) + 1)
+        v_iou = overlap / (anchor_h + line_h - overlap)
+        fg = np.where((anchor_cx >= x1) & (anchor_cx <= x2) & (v_iou > min_v_iou))[0]
+        cls[0, fg, 1] += 12 * v_iou[fg]
+        cls[0, fg, 0] -= 6
+        regr[0, fg, 0] += ((y1 + y2) * 0.5 - anchor_cy[fg]) / anchor_h[fg]
+        regr[0, fg, 1] += np.log(line_h / anchor_h[fg])
+    return cls, regr
+
+
+@contextlib.contextmanager
+def recording_nms(recorded):
+    """Appends the boxes of every NMS of the detector
+    within the with-block to recorded."""
+    nms = cptn.nms
+
+    def _record(dets, thresh, backend="auto"):
+        recorded.append(np.array(dets))
+        return nms(dets, thresh, backend)
+
+    cptn.nms = _record
+    try:
+        yield
+    finally:
+        cptn.nms = nms
+
+
+@contextlib.contextmanager
+def recording_proposals(recorded):
+    """Appends the inputs of every grouping of text proposals
+    within the with-block to recorded."""
+    group_text_proposals = TextProposalConnectorOriented.group_text_proposals
+
+    def _record(self, text_proposals, scores, im_size):
+        recorded.append((np.array(text_proposals), np.array(scores), tuple(im_size)))
+        return group_text_proposals(self, text_proposals, scores, im_size)
+
+    TextProposalConnectorOriented.group_text_proposals = _record
+    try:
+        yield
+    finally:
+        TextProposalConnectorOriented.group_text_proposals = group_text_proposals
+
+
+def detect_proposals(detector, image, rng=None):
+    """Returns the boxes passed to NMS and the (text_proposals, scores,
+    im_size) grouped into lines when detecting text on the image. The
+    network outputs are synthesized from the text lines of the image
+    if rng is given."""
+    boxes, proposals = [], []
+    with recording_nms(boxes), recording_proposals(proposals), contextlib.redirect_stdout(io.StringIO()):
+        if rng is None:
+            detector.detect(image)
+        else:
+            h, w = image.shape[:2]
+            cls, regr = make_outputs(rng, find_text_lines(image), h, w)
+            detector.postprocess(cls, regr, h, w)
+    return boxes[0], proposals[0]
+
+
+def make_detector(detector_model_path, alphabet_path, execution_providers):
+    """Returns the detector and whether its outputs have to be synthesized
+    because data/cptn.onnx is missing. The stand-in detector is then only
+    used for its post-processing."""
+    synthesize = not os.path.exists(detector_model_path)
+    if synthesize:
+        detector_model_path, _ = make_stand_in_models(
+            os.path.join(tempfile.gettempdir(), "chinese-overlay-stand-in"), alphabet_path)
+    return cptn.CPTNDetector(detector_model_path, execution_providers), synthesize
+
+
+@click.command()
+@click.option("--detector-model-path", type=click.Path(dir_okay=False), default=os.path.join("data", "cptn.onnx"))
+@click.option("--alphabet-path", type=click.Path(exists=True, dir_okay=False), default=os.path.join("data", "alphabet.pkl"))
+@click.option("--execution-providers", multiple=True, default=["CPUExecutionProvider"])
+@click.option("--seed", type=click.INT, default=0)
+def main(detector_model_path, alphabet_path, execution_providers, seed):
+    detector, synthesize = make_detector(detector_model_path, alphabet_path, execution_providers)
+    if synthesize:
+        print("Synthesizing the detector outputs from the text lines of the screenshots")
+
+    os.makedirs(RECORDED_DIR, exist_ok=True)
+    for name, image in load_screenshots():
+        rng = np.random.RandomState(seed) if synthesize else None
+        dets, (text_proposals, scores, im_size) = detect_proposals(detector, image, rng)
+
+        output_path = os.path.join(RECORDED_DIR, "nms-%s.npz" % os.path.splitext(name)[0])
+        np.savez_compressed(output_path, dets=dets)
+        print("Recorded %d boxes to %s" % (len(dets), output_path))
+
+        output_path = os.path.join(RECORDED_DIR, "proposals-%s.npz" % os.path.splitext(name)[0])
+        np.savez_compressed(output_path, text_proposals=text_proposals, scores=scores, im_size=np.array(im_size))
+        print("Recorded %d proposals to %s" % (len(text_proposals), output_path))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Compares the speed and the character error rate (CER) of the quantized
+network variants against the fp32 networks on the screenshots.
+
+The recognizers are compared on the same text lines detected by the fp32
+detector. Every combination of detector and recognizer variant is also
+compared on the whole text of every image. Variants that do not exist
+are skipped; create them with `python -m ocr.quantize`.
+
+Run from the repository root with `python -m benchmarks.quantization`."""
+import os
+
+import click
+
+from ocr.ocr import OCR, sort_box
+from ocr.detection.cptn import CPTNDetector
+from ocr.recognition.crnn import CRNNRecognizer
+from ocr.variants import MODEL_VARIANTS, variant_path
+from benchmarks.common import time_fn, load_screenshots, character_error_rate
+
+
+@click.command()
+@click.option("--detector-model-path", type=click.Path(exists=True, dir_okay=False), default=os.path.join("data", "cptn.onnx"))
+@click.option("--recognizer-model-path", type=click.Path(exists=True, dir_okay=False), default=os.path.join("data", "crnn.onnx"))
+@click.option("--alphabet-path", type=click.Path(exists=True, dir_okay=False), default=os.path.join("data", "alphabet.pkl"))
+@click.option("--execution-providers", multiple=True, default=["CPUExecutionProvider"])
+@click.option("--images", type=click.STRING, default=os.path.join("screenshots", "*.jpg"))
+@click.option("--max-height", type=click.INT, default=1000)
+@click.option("--repeats", type=click.INT, default=5)
+def main(detector_model_path, recognizer_model_path, alphabet_path, execution_providers, images, max_height, repeats):
+    images = [image for _, image in load_screenshots(images, max_height)]
+
+    detectors, recognizers = {}, {}
+    for variant in MODEL_VARIANTS:
+        if os.path.exists(variant_path(detector_model_path, variant)):
+            detectors[variant] = CPTNDetector(variant_path(detector_model_path, variant), execution_providers)
+        if os.path.exists(variant_path(recognizer_model_path, variant)):
+            recognizers[variant] = CRNNRecognizer(
+                variant_path(recognizer_model_path, variant), alphabet_path, execution_providers)
+
+    # Text lines and their crops found by every detector
+    text_recs = {
+        variant: [sort_box(detector.detect(image)[0]) for image in images]
+        for variant, detector in detectors.items()
+    }
+    reference_ocr = OCR(detectors["fp32"], recognizers["fp32"], batch_recognition=False)
+    crops = [reference_ocr._crop_lines(image, recs)[0] for image, recs in zip(images, text_recs["fp32"])]
+    lines = [crop for image_crops in crops for crop in image_crops]
+    reference_lines = [recognizers["fp32"].recognize(crop) for crop in lines]
+
+    print("%-10s %-14s %14s %10s" % ("network", "variant", "time (ms)", "CER"))
+    for variant, detector in detectors.items():
+        seconds = sum(time_fn(lambda: detector.detect(image), repeats) for image in images)
+        line_count = sum(len(recs) for recs in text_recs[variant])
+        print("%-10s %-14s %14.1f %10s  %d lines" % ("detector", variant, seconds * 1000, "", line_count))
+
+    for variant, recognizer in recognizers.items():
+        seconds = time_fn(lambda: [recognizer.recognize(crop) for crop in lines], repeats)
+        cer = character_error_rate(reference_lines, [recognizer.recognize(crop) for crop in lines])
+        print("%-10s %-14s %14.1f %9.2f%%" % ("recognizer", variant, seconds * 1000, cer * 100))
+
+    # Whole text of every image with every combination of variants
+    def _image_texts(detector_variant, recognizer):
+        ocr = OCR(detectors[detector_variant], recognizer, batch_recognition=False)
+        texts = []
+        for image, recs in zip(images, text_recs[detector_variant]):
+            result = ocr._char_rec(image, recs)
+            texts.append("\n".join(result[index][1] for index in sorted(result)))
+        return texts
+
+    reference_texts = _image_texts("fp32", recognizers["fp32"])
+    print()
+    print("%-14s %-14s %10s" % ("detector", "recognizer", "CER"))
+    for detector_variant in detectors:
+        for recognizer_variant, recognizer in recognizers.items():
+            cer = character_error_rate(reference_texts, _image_texts(detector_variant, recognizer))
+            print("%-14s %-14s %9.2f%%" % (detector_variant, recognizer_variant, cer * 100))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""Benchmarks per-frame text recognition time against the number of
+text lines, comparing one inference per line with batched recognition.
+
+Run from the repository root with `python -m benchmarks.recognition`."""
+import os
+import random
+import string
+
+import click
+import cv2
+import numpy as np
+
+from ocr.recognition.crnn import CRNNRecognizer
+from benchmarks.common import time_fn
+
+
+def make_line_image(rng, height=32):
+    """Returns a synthetic white text-line image with black characters."""
+    text = "".join(rng.choice(string.ascii_letters + string.digits)
+                   for _ in range(rng.randint(4, 30)))
+    (width, text_height), _ = cv2.getTextSize(
+        text, cv2.FONT_HERSHEY_SIMPLEX, 1, 2)
+    image = np.full((text_height + 16, width + 16, 3), 255, np.uint8)
+    cv2.putText(image, text, (8, text_height + 8),
+                cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 0), 2)
+    return cv2.resize(image, (int(image.shape[1] * height / image.shape[0]), height))
+
+
+@click.command()
+@click.option("--recognizer-model-path", type=click.Path(exists=True, dir_okay=False), default=os.path.join("data", "crnn.onnx"))
+@click.option("--alphabet-path", type=click.Path(exists=True, dir_okay=False), default=os.path.join("data", "alphabet.pkl"))
+@click.option("--execution-providers", multiple=True, default=["CPUExecutionProvider"])
+@click.option("--line-counts", multiple=True, type=click.INT, default=[1, 5, 10, 20, 40])
+@click.option("--repeats", type=click.INT, default=5)
+def main(recognizer_model_path, alphabet_path, execution_providers, line_counts, repeats):
+    recognizer = CRNNRecognizer(
+        recognizer_model_path, alphabet_path, execution_providers)
+    rng = random.Random(0)
+
+    print("%8s %14s %14s %8s" % ("lines", "per-line (ms)", "batched (ms)", "speedup"))
+    for line_count in line_counts:
+        images = [make_line_image(rng) for _ in range(line_count)]
+
+        per_line = time_fn(
+            lambda: [recognizer.recognize(image) for image in images], repeats)
+        batched = time_fn(lambda: recognizer.recognize_batch(images), repeats)
+
+        print("%8d %14.2f %14.2f %7.2fx" % (
+            line_count, per_line * 1000, batched * 1000, per_line / batched))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Benchmarks _char_rec with the text lines rectified by rotating the whole
+image per line against warping only the strip of every line, and reports
+the character error rate of the strip warps against the full rotations.
+Lines can be skewed artificially so that every line takes the warp path.
+
+Falls back to small stand-in models if the networks in data/ are missing.
+
+Run from the repository root with `python -m benchmarks.rectification`."""
+import contextlib
+import io
+import os
+import random
+import tempfile
+
+import click
+import numpy as np
+
+from ocr.ocr import make_default_ocr
+from benchmarks.common import time_fn, load_screenshots, make_text_image, character_error_rate
+from benchmarks.standin import make_stand_in_models
+
+
+def skew_lines(text_recs, degrees):
+    """Returns the text lines with their right ends raised by the angle."""
+    skewed = []
+    for rec in text_recs:
+        rec = np.array(rec, np.float64)
+        rise = np.tan(np.radians(degrees)) * (rec[2] - rec[0])
+        rec[3] -= rise
+        rec[7] -= rise
+        skewed.append(rec)
+    return skewed
+
+
+@click.command()
+@click.option("--detector-model-path", type=click.Path(dir_okay=False), default=os.path.join("data", "cptn.onnx"))
+@click.option("--recognizer-model-path", type=click.Path(dir_okay=False), default=os.path.join("data", "crnn.onnx"))
+@click.option("--alphabet-path", type=click.Path(exists=True, dir_okay=False), default=os.path.join("data", "alphabet.pkl"))
+@click.option("--execution-providers", multiple=True, default=["CPUExecutionProvider"])
+@click.option("--line-count", type=click.INT, default=30, help="Number of text lines of the synthetic 1440p image.")
+@click.option("--skews", multiple=True, type=click.FLOAT, default=[0, 2], help="Angles in degrees to skew the lines by.")
+@click.option("--repeats", type=click.INT, default=5)
+def main(detector_model_path, recognizer_model_path, alphabet_path, execution_providers, line_count, skews, repeats):
+    if not (os.path.exists(detector_model_path) and os.path.exists(recognizer_model_path)):
+        print("Using stand-in models")
+        detector_model_path, recognizer_model_path = make_stand_in_models(
+            os.path.join(tempfile.gettempdir(), "chinese-overlay-stand-in"), alphabet_path)
+
+    ocr = make_default_ocr(detector_model_path, recognizer_model_path, alphabet_path, execution_providers)
+    ocr.batch_recognition = False
+
+    inputs = load_screenshots()
+    inputs.append(("2560x1440-%dlines" % line_count, make_text_image(random.Random(0), 2560, 1440, line_count)))
+
+    def _texts(image, text_recs):
+        result = ocr._char_rec(image, text_recs)
+        return [result[index][1] if index in result else "" for index in range(len(text_recs))]
+
+    print("%-24s %6s %6s %11s %11s %8s %8s" % ("input", "skew", "lines", "full (ms)", "roi (ms)", "speedup", "CER"))
+    for name, image in inputs:
+        with contextlib.redirect_stdout(io.StringIO()):
+            detected = ocr.detect(image)
+
+        for skew in skews:
+            text_recs = skew_lines(detected, skew)
+            times, texts = {}, {}
+            for rectification in ["full", "roi"]:
+                ocr.rectification = rectification
+                times[rectification] = time_fn(lambda: ocr._char_rec(image, text_recs), repeats)
+                texts[rectification] = _texts(image, text_recs)
+
+            cer = character_error_rate(texts["full"], texts["roi"])
+            print("%-24s %6.1f %6d %11.1f %11.1f %7.2fx %7.2f%%" % (
+                name, skew, len(text_recs), times["full"] * 1000, times["roi"] * 1000,
+                times["full"] / times["roi"], cer * 100))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Small stand-in ONNX models with the same inputs and outputs as the
+CPTN detector and the CRNN recognizer. They produce meaningless results
+but allow running the benchmarks without the real weights in data/."""
+import os
+
+import numpy as np
+import onnx
+from onnx import helper, numpy_helper, TensorProto
+
+from ocr.recognition.crnn import get_alphabet
+
+
+def _save(graph, path):
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid("", 11)])
+    model.ir_version = 6
+    onnx.save(model, path)
+
+
+def make_detector_model(path, seed=0):
+    """Writes a detector that maps an image of shape (1, 3, H, W) to
+    the class scores and box regressions of 10 anchors per 16x16 cell."""
+    rng = np.random.RandomState(seed)
+    weights = rng.randn(40, 3, 1, 1).astype(np.float32) * 0.05
+    nodes = [
+        helper.make_node("AveragePool", ["images"], ["pooled"], kernel_shape=[16, 16], strides=[16, 16]),
+        helper.make_node("Conv", ["pooled", "weights"], ["features"]),
+        helper.make_node("Transpose", ["features"], ["transposed"], perm=[0, 2, 3, 1]),
+        helper.make_node("Reshape", ["transposed", "shape"], ["anchors"]),
+        helper.make_node("Split", ["anchors"], ["cls", "regr"], axis=2, split=[2, 2]),
+    ]
+    graph = helper.make_graph(
+        nodes, "cptn_stand_in",
+        [helper.make_tensor_value_info("images", TensorProto.FLOAT, [1, 3, None, None])],
+        [helper.make_tensor_value_info("cls", TensorProto.FLOAT, None),
+         helper.make_tensor_value_info("regr", TensorProto.FLOAT, None)],
+        [numpy_helper.from_array(weights, "weights"),
+         numpy_helper.from_array(np.array([1, -1, 4], np.int64), "shape")])
+    _save(graph, path)
+
+
+def make_recognizer_model(path, class_count, seed=0):
+    """Writes a recognizer that maps text lines of shape (B, 1, 32, W)
+    to class scores of shape (W / 4, B, class_count)."""
+    rng = np.random.RandomState(seed)
+    weights = rng.randn(class_count, 1, 1, 1).astype(np.float32) * 3
+    nodes = [
+        helper.make_node("AveragePool", ["images"], ["pooled"], kernel_shape=[32, 4], strides=[32, 4]),
+        helper.make_node("Conv", ["pooled", "weights"], ["features"]),
+        helper.make_node("Squeeze", ["features"], ["squeezed"], axes=[2]),
+        helper.make_node("Transpose", ["squeezed"], ["preds"], perm=[2, 0, 1]),
+    ]
+    graph = helper.make_graph(
+        nodes, "crnn_stand_in",
+        [helper.make_tensor_value_info("images", TensorProto.FLOAT, [None, 1, 32, None])],
+        [helper.make_tensor_value_info("preds", TensorProto.FLOAT, None)],
+        [numpy_helper.from_array(weights, "weights")])
+    _save(graph, path)
+
+
+def make_stand_in_models(directory, alphabet_path, seed=0):
+    """Writes the stand-in detector and recognizer to the directory
+    and returns their paths."""
+    os.makedirs(directory, exist_ok=True)
+    detector_path = os.path.join(directory, "cptn.onnx")
+    recognizer_path = os.path.join(directory, "crnn.onnx")
+    make_detector_model(detector_path, seed)
+    make_recognizer_model(recognizer_path, len(get_alphabet(alphabet_path)) + 1, seed)
+    return detector_path, recognizer_path
@@ -0,0 +1,117 @@
+"""Benchmarks the cold start in fresh processes: importing the command
+line module, creating the inference sessions one after the other or in
+parallel, with and without cached optimized models, and the latency of
+the first image with and without a warm-up inference.
+
+Run from the repository root with `python -m benchmarks.startup`."""
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+import click
+import numpy as np
+
+from benchmarks.standin import make_stand_in_models
+
+IMPORT_CODE = """
+import json
+from time import perf_counter
+start = perf_counter()
+import cli
+print(json.dumps({"import": perf_counter() - start}))
+"""
+
+SESSIONS_CODE = """
+import json
+from time import perf_counter
+start = perf_counter()
+from ocr.ocr import CPTNDetector, CRNNRecognizer, make_default_ocr
+imported = perf_counter()
+if {parallel!r}:
+    make_default_ocr({detector!r}, {recognizer!r}, {alphabet!r}, {providers!r}, optimized_model_dir={cache!r})
+else:
+    CPTNDetector({detector!r}, {providers!r}, optimized_model_dir={cache!r})
+    CRNNRecognizer({recognizer!r}, {alphabet!r}, {providers!r}, optimized_model_dir={cache!r})
+print(json.dumps({{"sessions": perf_counter() - imported}}))
+"""
+
+FIRST_IMAGE_CODE = """
+import json
+from time import perf_counter
+import cv2
+import numpy as np
+from ocr.ocr import make_default_ocr
+image = np.ascontiguousarray(cv2.imread({image!r})[:, :, ::-1])
+ocr = make_default_ocr({detector!r}, {recognizer!r}, {alphabet!r}, {providers!r})
+start = perf_counter()
+if {warmup!r}:
+    ocr.warmup(image.shape[1], image.shape[0])
+warmed = perf_counter()
+ocr.run(image)
+print(json.dumps({{"warmup": warmed - start, "first image": perf_counter() - warmed}}))
+"""
+
+
+def run_fresh(code, repeats, before=None):
+    """Runs the code in fresh processes and returns the median of every
+    value it prints as a dictionary on its last output line."""
+    values = {}
+    for _ in range(repeats):
+        if before is not None:
+            before()
+        output = subprocess.run(
+            [sys.executable, "-c", code], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+            universal_newlines=True, check=True).stdout
+        for key, value in json.loads(output.strip().splitlines()[-1]).items():
+            values.setdefault(key, []).append(value)
+    return {key: float(np.median(value)) for key, value in values.items()}
+
+
+@click.command()
+@click.option("--detector-model-path", type=click.Path(dir_okay=False), default=os.path.join("data", "cptn.onnx"))
+@click.option("--recognizer-model-path", type=click.Path(dir_okay=False), default=os.path.join("data", "crnn.onnx"))
+@click.option("--alphabet-path", type=click.Path(exists=True, dir_okay=False), default=os.path.join("data", "alphabet.pkl"))
+@click.option("--execution-providers", multiple=True, default=["CPUExecutionProvider"])
+@click.option("--image-path", type=click.Path(exists=True, dir_okay=False), default=os.path.join("screenshots", "douyu.jpg"))
+@click.option("--repeats", type=click.INT, default=5)
+def main(detector_model_path, recognizer_model_path, alphabet_path, execution_providers, image_path, repeats):
+    work_dir = tempfile.mkdtemp()
+    if not (os.path.exists(detector_model_path) and os.path.exists(recognizer_model_path)):
+        print("Using stand-in models")
+        detector_model_path, recognizer_model_path = make_stand_in_models(
+            os.path.join(work_dir, "models"), alphabet_path)
+
+    cache_dir = os.path.join(work_dir, "optimized")
+    paths = dict(detector=detector_model_path, recognizer=recognizer_model_path, alphabet=alphabet_path,
+                 providers=list(execution_providers))
+
+    def _clear_cache():
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+    def _sessions(parallel, cache=None, before=None):
+        code = SESSIONS_CODE.format(parallel=parallel, cache=cache, **paths)
+        return run_fresh(code, repeats, before)["sessions"]
+
+    try:
+        print("%-40s %10s" % ("", "time (ms)"))
+        print("%-40s %10.1f" % ("import cli", run_fresh(IMPORT_CODE, repeats)["import"] * 1000))
+        print("%-40s %10.1f" % ("sessions, sequential", _sessions(False) * 1000))
+        print("%-40s %10.1f" % ("sessions, parallel", _sessions(True) * 1000))
+        print("%-40s %10.1f" % ("sessions, parallel, empty cache", _sessions(True, cache_dir, _clear_cache) * 1000))
+        print("%-40s %10.1f" % ("sessions, parallel, cached", _sessions(True, cache_dir) * 1000))
+
+        for warmup in [False, True]:
+            result = run_fresh(FIRST_IMAGE_CODE.format(image=image_path, warmup=warmup, **paths), repeats)
+            if warmup:
+                print("%-40s %10.1f" % ("warm-up", result["warmup"] * 1000))
+            print("%-40s %10.1f" % ("first image, %s warm-up" % ("with" if warmup else "without"),
+                                    result["first image"] * 1000))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
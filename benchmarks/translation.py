@@ -0,0 +1,39 @@
+"""Benchmarks machine translation of all sentences of a frame with one
+request per sentence against batched concurrent requests, using the
+offline stand-in backend.
+
+Run from the repository root with `python -m benchmarks.translation`."""
+from time import perf_counter
+
+import click
+
+from translation import LocalTranslatorBackend, BatchTranslator
+
+
+@click.command()
+@click.option("--sentence-counts", multiple=True, type=click.INT, default=[1, 5, 10, 20, 40])
+@click.option("--latency", type=click.FLOAT, default=0.1, help="Simulated latency per request in seconds.")
+@click.option("--latency-per-text", type=click.FLOAT, default=0.005, help="Simulated latency per text in seconds.")
+def main(sentence_counts, latency, latency_per_text):
+    backend = LocalTranslatorBackend(latency, latency_per_text)
+
+    print("%10s %16s %16s %8s" % ("sentences", "sequential (ms)", "batched (ms)", "speedup"))
+    for count in sentence_counts:
+        sentences = ["sentence %d of frame %d" % (index, count) for index in range(count)]
+
+        start = perf_counter()
+        for sentence in sentences:
+            backend.translate_batch([sentence])
+        sequential = perf_counter() - start
+
+        translator = BatchTranslator(backend, max_batch_size=8)
+        start = perf_counter()
+        translations = translator.translate_all(sentences)
+        batched = perf_counter() - start
+        assert translations == sentences
+
+        print("%10d %16.1f %16.1f %7.2fx" % (count, sequential * 1000, batched * 1000, sequential / batched))
+
+
+if __name__ == "__main__":
+    main()
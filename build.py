@@ -4,6 +4,8 @@ from pathlib import Path
 import shutil
 import click
 
+from translation.cedict_index import build_index
+
 
 def write_text(path, text):
     """Writes a file to the path with the given text."""
@@ -16,6 +18,18 @@ def write_script(path_without_ext, command, is_windows):
     path = "%s.%s" % (path_without_ext, "bat" if is_windows else "sh")
     write_text(path, "%s %s" % (executable, command))
 
+def data_arguments(data_path, excluded):
+    """Returns the pyinstaller arguments for bundling the files in the
+    data directory except for the excluded file names."""
+    arguments = []
+    for path in sorted(data_path.iterdir()):
+        if path.name in excluded:
+            print("Not bundling", path)
+            continue
+        destination = "data/%s/" % path.name if path.is_dir() else "data/"
+        arguments += ["--add-data", "%s;%s" % (path.as_posix(), destination)]
+    return arguments
+
 @click.command()
 def main():
     is_windows = os.name == "nt"
@@ -24,14 +38,20 @@ def main():
     dist_base_path = Path("dist")
     dist_path = dist_base_path / "cli"
 
+    # Compile the dictionary index which gets bundled with the data
+    print("Building dictionary index")
+    build_index(Path("data") / "cedict.idx")
+
     command = [
         "pyinstaller",
         "--distpath", str(dist_base_path),
-        "--add-data", "data/*;data/",
         "--add-data", "ui/views/overlay.qml;ui/views/",
         "cli.py"
     ]
 
+    # Files that older versions wrote to data/ while running are specific to the user that wrote them
+    command += data_arguments(Path("data"), excluded={"optimized", "heatmap.npy"})
+
     # Add dll that pyinstaller misses on Windows
     if is_windows:
         orig_dll_path = Path("C:/") / "Windows" / \
@@ -1,60 +1,130 @@
+import atexit
 import logging
+import multiprocessing
 import os
 import time
+import traceback
 from collections import namedtuple
+from functools import partial
 import asyncio
 
 import numpy as np
 import click
 import six  # bug with pyinstaller without this
-from pytictoc import TicToc
 
-from translation import get_pinyin, get_all_phrase_translations, contains_chinese, get_translate_fn
-from ocr import make_default_ocr
-from ocr.detection.utils import resize
+from translation import get_sentence_translation, contains_chinese, get_translate_fn, TranslationCache, \
+    use_cedict_index
+from ocr.metrics import metrics
+from ocr.variants import MODEL_VARIANTS, variant_path
+
+
+# Directory for the files written while running such as caches. They are kept
+# out of data/ so that a developer's files are never bundled by the build script.
+USER_CACHE_DIR = os.path.join(
+    os.environ.get("LOCALAPPDATA") or os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"),
+    "chinese-overlay")
 
 
 def _awaitable(f, *args):
     return asyncio.get_running_loop().run_in_executor(None, f, *args)
 
 
-async def get_ocr_results(ocr, image, max_height):
-    """Runs OCR on a given image and returns the recognized text,
-    text as pinyin, position and dictionary translations."""
-    tic_toc = TicToc()
+def make_ocr(**kwargs):
+    """Creates the OCR. The networks and their dependencies are only
+    imported here so that commands and processes that do not run OCR
+    start quickly."""
+    from ocr.ocr import make_default_ocr
+    return make_default_ocr(**kwargs)
+
+
+# Channel count and the channels to select in RGB order for every raw pixel format
+RAW_FORMATS = {
+    "rgb": (3, slice(None)),
+    "bgr": (3, slice(None, None, -1)),
+    "rgba": (4, slice(0, 3)),
+    "bgra": (4, slice(2, None, -1)),
+}
+
+
+def raw_image_view(buffer, width, height, pixel_format):
+    """Returns an RGB view of a raw 8-bit pixel buffer without copying it."""
+    channels, rgb = RAW_FORMATS[pixel_format]
+    image = np.frombuffer(buffer, np.uint8).reshape(height, width, channels)
+    return image[..., rgb]
+
 
+def parse_regions(text):
+    """Parses regions of interest given as "left,top,right,bottom;..."."""
+    if not text:
+        return None
+    regions = [tuple(int(value) for value in region.split(",")) for region in text.split(";")]
+    if any(len(region) != 4 for region in regions):
+        raise ValueError("Regions need four values")
+    return regions
+
+
+def run_ocr(ocr, image, max_height, translation_cache=None, regions=None, screen_shape=None):
+    """Runs OCR on a given image and returns the recognized text,
+    text as pinyin, position and dictionary translations.
+    Translations are looked up in the translation cache if given.
+    Only the regions (left, top, right, bottom) are processed if given.
+    Positions are scaled to screen_shape if the image was already
+    downscaled from a larger screen."""
     # Determine the ratio from detection coords to image coords.
     # Downscale if the hight exceeds the max height.
-    image_to_screen = [1, 1]
-    if image.shape[0] > max_height:
-        tic_toc.tic()
-        orig_shape = image.shape
-        image = resize(image, height=max_height)
-        image_to_screen = [
-            orig_shape[0] / image.shape[0],
-            orig_shape[1] / image.shape[1]
-        ]
-        tic_toc.toc("Downscaled image in")
+    orig_shape = image.shape if screen_shape is None else screen_shape
+    if max_height is not None and image.shape[0] > max_height:
+        from ocr.detection.utils import resize
+        with metrics.stage("downscale"):
+            image = resize(image, height=max_height)
+    image_to_screen = [
+        orig_shape[0] / image.shape[0],
+        orig_shape[1] / image.shape[1]
+    ]
+
+    if regions is not None:
+        from ocr.regions import RegionOCR
+        ocr = RegionOCR(ocr, [
+            (l / image_to_screen[1], t / image_to_screen[0], r / image_to_screen[1], b / image_to_screen[0])
+            for l, t, r, b in regions
+        ])
 
     # Detect sentences in image
-    tic_toc.tic()
     print("Image shape:", image.shape, "dtype", image.dtype)
-    result, _ = await _awaitable(ocr.run, image)
+    with metrics.stage("ocr"):
+        result, _ = ocr.run(image)
+
+    return translate_results(result, image_to_screen, translation_cache)
+
+
+async def get_ocr_results(ocr, image, max_height, translation_cache=None, regions=None, screen_shape=None):
+    """Runs run_ocr on a worker thread so that the event loop is not blocked."""
+    return await _awaitable(partial(run_ocr, ocr, image, max_height, translation_cache, regions, screen_shape))
+
+
+def translate_results(result, image_to_screen, translation_cache=None):
+    """Returns the text, text as pinyin, screen position and dictionary
+    translations of the Chinese text lines of an OCR result.
+    Translations are looked up in the translation cache if given."""
     sentences = [
         {"text": r[1], "position": r[0][:2]}
         for r in result.values()
     ]
-    tic_toc.toc("OCR in", restart=True)
+    metrics.increment("ocr_images_total")
+    metrics.increment("ocr_lines_total", len(sentences))
+    metrics.increment("ocr_characters_total", sum(len(sentence["text"]) for sentence in sentences))
 
     # Translate the detected sentences and store results
     results = []
     for sentence in sentences:
         orig_text = sentence["text"]
         if contains_chinese(orig_text):
-            pinyin_text = get_pinyin(orig_text)
-            translations = get_all_phrase_translations(orig_text)
-            translation_text = "\n".join(
-                ["%s (%s): %s" % (t[0], get_pinyin(t[0]), ", ".join(t[1])) for t in translations])
+            with metrics.stage("dictionary"):
+                if translation_cache is not None:
+                    pinyin_text, translation_text = translation_cache.get_or_compute(
+                        orig_text, get_sentence_translation)
+                else:
+                    pinyin_text, translation_text = get_sentence_translation(orig_text)
 
             position = (
                 int(sentence["position"][0] * image_to_screen[0]),
@@ -68,31 +138,160 @@ async def get_ocr_results(ocr, image, max_height):
                 "translation_text": translation_text
             })
 
-    tic_toc.toc("Translate in")
-
     return results
 
-BaseArgs = namedtuple("BaseArgs", ["ocr", "max_height"])
+
+class ResultTracker:
+    """Keeps the results of the previous frame of a stream and assigns
+    stable ids to its lines. Returns the lines that were added, changed
+    or removed when updated with the results of the next frame."""
+
+    def __init__(self, max_distance=32):
+        self.max_distance = max_distance
+        self.reset()
+
+    def reset(self):
+        self.lines = {}
+        self.next_id = 0
+
+    def _find(self, lines, result):
+        # Lines keep their id if the text moved or if the text at a position changed
+        for line_id, line in lines.items():
+            if line["text"] == result["text"]:
+                return line_id
+
+        distances = [
+            (max(abs(line["position"][0] - result["position"][0]),
+                 abs(line["position"][1] - result["position"][1])), line_id)
+            for line_id, line in lines.items()
+        ]
+        if len(distances) > 0 and min(distances)[0] <= self.max_distance:
+            return min(distances)[1]
+
+        return None
+
+    def update(self, results):
+        previous = dict(self.lines)
+        self.lines = {}
+
+        pending = []
+        for result in results:
+            line_id = next((line_id for line_id, line in previous.items() if line == result), None)
+            if line_id is None:
+                pending.append(result)
+            else:
+                self.lines[line_id] = previous.pop(line_id)
+
+        added, changed = [], []
+        for result in pending:
+            line_id = self._find(previous, result)
+            if line_id is None:
+                line_id = self.next_id
+                self.next_id += 1
+                added.append(dict(result, id=line_id))
+            else:
+                del previous[line_id]
+                changed.append(dict(result, id=line_id))
+            self.lines[line_id] = result
+
+        return {
+            "added": added,
+            "changed": changed,
+            "removed": sorted(previous)
+        }
+
+
+BaseArgs = namedtuple("BaseArgs", ["make_ocr", "max_height", "translation_cache"])
 
 
 @click.group()
 @click.option("--max-height", type=click.INT, default=1440,
               help="Height that images will be resized to when exceeded.")
+@click.option("--tile-size", type=click.INT, default=None,
+              help="Detects text in overlapping square tiles of this size at full resolution instead of downscaling to the max height.")
+@click.option("--tile-overlap", type=click.INT, default=128,
+              help="Overlap in pixels between neighboring tiles. Should exceed the height of the largest text.")
+@click.option("--tile-workers", type=click.INT, default=1,
+              help="Number of threads that detect tiles concurrently.")
+@click.option("--adaptive-text-height", type=click.INT, default=None,
+              help="Detects text at the smallest scale that keeps the text of recent images this many pixels high. Disabled by default.")
+@click.option("--min-detection-scale", type=click.FLOAT, default=0.25,
+              help="Smallest scale the adaptive text height can reduce the detection resolution to.")
+@click.option("--recognition-cache-mb", type=click.FLOAT, default=16,
+              help="Memory budget in MB for caching recognized text lines. 0 disables the cache.")
+@click.option("--translation-cache-size", type=click.INT, default=4096,
+              help="Number of sentence translations cached in memory. 0 disables the cache.")
+@click.option("--translation-cache-path", type=click.Path(dir_okay=False), default=None,
+              help="SQLite file for persisting sentence translations between sessions.")
+@click.option("--translation-cache-disk-size", type=click.INT, default=100000,
+              help="Number of sentence translations kept in the SQLite file.")
 @click.option("--detector-model-path", type=click.Path(exists=True, dir_okay=False), default=os.path.join("data", "cptn.onnx"),
               help="File path to the detector network onnx.")
 @click.option("--recognizer-model-path", type=click.Path(exists=True, dir_okay=False), default=os.path.join("data", "crnn.onnx"),
               help="File path to the recognizer network onnx.")
 @click.option("--alphabet-path", type=click.Path(exists=True, dir_okay=False), default=os.path.join("data", "alphabet.pkl"),
               help="File path to the pickled alphabet.")
+@click.option("--detector-variant", type=click.Choice(MODEL_VARIANTS), default="fp32",
+              help="Precision of the detector network. Quantized variants are created with `python -m ocr.quantize`.")
+@click.option("--recognizer-variant", type=click.Choice(MODEL_VARIANTS), default="fp32",
+              help="Precision of the recognizer network. Quantized variants are created with `python -m ocr.quantize`.")
 @click.option("--execution-providers", multiple=True, default=["DmlExecutionProvider"],
               help="ONNX runtime execution providers to use for running the networks.")
+@click.option("--intra-op-threads", type=click.INT, default=None,
+              help="Number of threads ONNX runtime uses within a network operation. Uses all cores by default.")
+@click.option("--optimized-model-dir", type=click.Path(file_okay=False), default=os.path.join(USER_CACHE_DIR, "optimized"),
+              help="Directory for caching the optimized networks between launches. An empty string disables the cache.")
+@click.option("--warmup/--no-warmup", default=True,
+              help="Whether to run the networks once on startup so that the first image is not slower.")
+@click.option("--io-binding/--no-io-binding", default=True,
+              help="Whether to run the networks on reused input and output buffers instead of allocating them per image.")
+@click.option("--cedict-index-path", type=click.Path(dir_okay=False), default=os.path.join("data", "cedict.idx"),
+              help="File path to the compiled dictionary index. The dictionary of the pinyin package is parsed if it does not exist.")
+@click.option("--verbose/--no-verbose", default=False,
+              help="Whether to log per-image details of the OCR such as the regions it processes and the detection scale.")
 @click.pass_context
-def main(ctx, max_height, detector_model_path, recognizer_model_path, alphabet_path, execution_providers):
-    ctx.obj = BaseArgs(max_height=max_height, ocr=make_default_ocr(
+def main(ctx, max_height, tile_size, tile_overlap, tile_workers, adaptive_text_height, min_detection_scale,
+         recognition_cache_mb, translation_cache_size, translation_cache_path, translation_cache_disk_size,
+         detector_model_path, recognizer_model_path, alphabet_path, detector_variant, recognizer_variant,
+         execution_providers, intra_op_threads, optimized_model_dir, warmup, io_binding, cedict_index_path, verbose):
+    # The OCR logs details of every image at debug level
+    logging.getLogger("ocr").setLevel(logging.DEBUG if verbose else logging.INFO)
+
+    if not use_cedict_index(cedict_index_path):
+        print("Dictionary index not found at", cedict_index_path)
+
+    translation_cache = None
+    if translation_cache_size > 0:
+        translation_cache = TranslationCache(
+            translation_cache_size, translation_cache_path, translation_cache_disk_size)
+        # Writes the pending last uses of the disk entries
+        atexit.register(translation_cache.close)
+
+    max_height = max_height if tile_size is None else None
+
+    detector_model_path = variant_path(detector_model_path, detector_variant)
+    recognizer_model_path = variant_path(recognizer_model_path, recognizer_variant)
+    for model_path in [detector_model_path, recognizer_model_path]:
+        if not os.path.exists(model_path):
+            raise click.BadParameter("%s does not exist. Run `python -m ocr.quantize` to create it." % model_path)
+
+    # The OCR is created by the subcommands as the server can run it in worker processes
+    ctx.obj = BaseArgs(max_height=max_height, translation_cache=translation_cache, make_ocr=partial(
+        make_ocr,
         detector_model_path=detector_model_path,
         recognizer_model_path=recognizer_model_path,
         alphabet_path=alphabet_path,
-        execution_providers=execution_providers
+        execution_providers=execution_providers,
+        tile_size=tile_size,
+        tile_overlap=tile_overlap,
+        tile_workers=tile_workers,
+        adaptive_text_height=adaptive_text_height,
+        min_detection_scale=min_detection_scale,
+        recognition_cache_bytes=int(recognition_cache_mb * 1024 * 1024),
+        intra_op_threads=intra_op_threads,
+        optimized_model_dir=optimized_model_dir or None,
+        warmup=warmup,
+        io_binding=io_binding
     ))
 
 
@@ -100,60 +299,173 @@ def main(ctx, max_height, detector_model_path, recognizer_model_path, alphabet_p
 @click.option("--host", type=click.STRING, default="127.0.0.1")
 @click.option("--port", type=click.INT, default=8081)
 @click.option("--image-max-size", type=click.INT, default=1024*1024*128)
+@click.option("--batch-window-ms", type=click.FLOAT, default=5,
+              help="Time to collect concurrent requests into a batch for. 0 runs requests separately.")
+@click.option("--max-batch-size", type=click.INT, default=8,
+              help="Maximum number of requests in a batch.")
+@click.option("--workers", type=click.INT, default=0,
+              help="Number of OCR worker processes. 0 runs OCR in the server process. Requests are not batched with workers.")
 @click.pass_obj
-def server(ctx, host, port, image_max_size):
+def server(ctx, host, port, image_max_size, batch_window_ms, max_batch_size, workers):
     """Runs an http server that can receive images and run OCR on them."""
     from aiohttp import web
     from imageio import imread
+    from ocr.incremental import IncrementalOCR
+    from ocr.scheduler import BatchScheduler
+    from ocr.workers import WorkerPool
 
     routes = web.RouteTableDef()
 
+    # Concurrent requests are either distributed to worker processes
+    # or batched and run on a single worker thread
+    pool = None
+    if workers > 0:
+        pool = ocr = WorkerPool(ctx.make_ocr, workers)
+    elif batch_window_ms > 0:
+        ocr = BatchScheduler(ctx.make_ocr(), max_batch_size, batch_window_ms / 1000)
+    else:
+        ocr = ctx.make_ocr()
+
     @routes.post("/")
     async def ocr_translate(request):
-        tic_toc = TicToc()
-
         # Read the image from the web request
-        tic_toc.tic()
         image_bytes = await request.read()
-        image = imread(image_bytes, pilmode="RGB")
-        tic_toc.toc("Read image in")
+        with metrics.stage("decode"):
+            image = imread(image_bytes, pilmode="RGB")
 
-        results = await get_ocr_results(ctx.ocr, image, ctx.max_height)
+        regions = _request_regions(request)
+        results = await get_ocr_results(ocr, image, ctx.max_height, ctx.translation_cache, regions)
 
         return web.json_response({
             "results": results
         })
 
+    @routes.post("/raw")
+    async def ocr_translate_raw(request):
+        """Receives raw pixels with the shape given as query parameters
+        width, height and format (rgb, bgr, rgba or bgra) which avoids
+        encoding and decoding the image."""
+        try:
+            width, height = int(request.query["width"]), int(request.query["height"])
+            pixel_format = request.query.get("format", "rgb").lower()
+            image = raw_image_view(await request.read(), width, height, pixel_format)
+        except (KeyError, ValueError) as e:
+            raise web.HTTPBadRequest(text="Invalid raw image: %s" % e)
+
+        regions = _request_regions(request)
+        results = await get_ocr_results(ocr, image, ctx.max_height, ctx.translation_cache, regions)
+
+        return web.json_response({
+            "results": results
+        })
+
+    def _request_regions(request):
+        """Returns the regions of interest given by the regions query parameter."""
+        try:
+            return parse_regions(request.query.get("regions"))
+        except ValueError as e:
+            raise web.HTTPBadRequest(text="Invalid regions: %s" % e)
+
+    @routes.get("/stream")
+    async def ocr_translate_stream(request):
+        """Receives a continuous stream of encoded frames and sends the lines
+        that were added, changed or removed since the previous processed frame.
+        Frames that arrive while a frame is processed replace each other so
+        only the latest one is processed next. Sending the text message "reset"
+        forgets the state of the stream."""
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+
+        incremental_ocr = IncrementalOCR(ocr)
+        tracker = ResultTracker()
+        frame_available = asyncio.Event()
+        latest = {"frame": None, "index": -1, "dropped": 0}
+
+        async def _process():
+            while True:
+                await frame_available.wait()
+                frame_available.clear()
+                image_bytes, index = latest["frame"], latest["index"]
+                latest["frame"] = None
+
+                try:
+                    # Decode off the event loop so incoming frames keep being received
+                    with metrics.stage("decode"):
+                        image = await _awaitable(partial(imread, pilmode="RGB"), image_bytes)
+                    results = await get_ocr_results(incremental_ocr, image, ctx.max_height, ctx.translation_cache)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    print("Stream frame %d failed:" % index)
+                    traceback.print_exc()
+                    # The next frame is processed fully as the failed one may have been only partially
+                    incremental_ocr.reset()
+                    if ws.closed:
+                        return
+                    await ws.send_json({"frame": index, "error": str(e)})
+                    continue
+
+                delta = tracker.update(results)
+                delta["frame"] = index
+                delta["dropped"] = latest["dropped"]
+                if ws.closed:
+                    return
+                await ws.send_json(delta)
+
+        process_task = asyncio.ensure_future(_process())
+        try:
+            async for msg in ws:
+                if msg.type == web.WSMsgType.BINARY:
+                    if latest["frame"] is not None:
+                        latest["dropped"] += 1
+                    latest["frame"] = msg.data
+                    latest["index"] += 1
+                    frame_available.set()
+                elif msg.type == web.WSMsgType.TEXT and msg.data == "reset":
+                    incremental_ocr.reset()
+                    tracker.reset()
+        finally:
+            process_task.cancel()
+
+        return ws
+
+    @routes.get("/metrics")
+    async def get_metrics(request):
+        return web.Response(text=metrics.render(), content_type="text/plain")
+
+    @routes.get("/health")
+    async def health(request):
+        return web.json_response({
+            "workers": pool.health() if pool is not None else []
+        })
+
     app = web.Application(client_max_size=image_max_size)
     app.add_routes(routes)
     web.run_app(app, host=host, port=port)
 
-
-def get_screenshot(sct, monitor):
-    """Takes a screenshot on the given monitor
-    and returns it as a numpy array."""
-    from PIL import Image
-    image = sct.grab(monitor)
-    image = Image.frombytes("RGB", image.size, image.bgra, "raw", "BGRX")
-    image = image.resize((image.size[0], image.size[1]))
-    image = np.asarray(image.convert("RGB"))
-    print(image.shape)
-    return image
+    if pool is not None:
+        pool.close()
 
 
 def get_text_fn(google_trans):
-    """Returns a function that constructs the text and tooltip
-    given OCR results."""
+    """Returns a function that constructs the texts and tooltips
+    given all OCR results of an image."""
     if google_trans:
         translate = get_translate_fn()
 
-        def text_from_result(results):
-            return translate(results["text"]), results["translation_text"]
+        def texts_from_results(results):
+            # Fall back to pinyin for translations that failed or timed out
+            with metrics.stage("machine_translation"):
+                translations = translate.translate_all([result["text"] for result in results])
+            return [
+                (translation if translation is not None else result["pinyin_text"], result["translation_text"])
+                for result, translation in zip(results, translations)
+            ]
     else:
-        def text_from_result(results):
-            return results["pinyin_text"], results["translation_text"]
+        def texts_from_results(results):
+            return [(result["pinyin_text"], result["translation_text"]) for result in results]
 
-    return text_from_result
+    return texts_from_results
 
 
 @main.command()
@@ -165,25 +477,110 @@ def get_text_fn(google_trans):
               help="Pixel-bounds to capture from as (left, top, width, height).")
 @click.option("--google-trans/--no-google-trans", default=False,
               help="Whether to google-translate the detected text.")
+@click.option("--capture-fps", type=click.FLOAT, default=None,
+              help="Captures continuously at this rate while the overlay is shown and only reprocesses changed regions.")
+@click.option("--band", "bands", multiple=True,
+              help='Band of the screen such as "bottom 20%" that captures on key presses search for text. Can be repeated.')
+@click.option("--learn-regions/--no-learn-regions", default=False,
+              help="Learns where text appears and only searches there on key presses, with a full rescan every --rescan-interval presses.")
+@click.option("--heat-map-path", type=click.Path(dir_okay=False), default=os.path.join(USER_CACHE_DIR, "heatmap.npy"),
+              help="File path the learned text regions are kept in between sessions.")
+@click.option("--rescan-interval", type=click.INT, default=10,
+              help="Number of key presses after which the whole screen is searched again when learning regions.")
 @click.pass_obj
-def ui(ctx, toggle_key, monitor_id, monitor_bounds, google_trans):
+def ui(ctx, toggle_key, monitor_id, monitor_bounds, google_trans, capture_fps, bands, learn_regions, heat_map_path,
+       rescan_interval):
     """Displays an overlay UI and translates within it."""
     import keyboard
     import mss
     import sys
     import signal
     from ui.overlay import LabelManager
-    from threading import Thread
+    from ui.capture import ScreenCapture
+    from ocr.incremental import IncrementalOCR
+    from ocr.pipeline import Pipeline, Stage
+    from threading import Thread, Event
+
+    from ocr.hotspots import HotRegionOCR, TextHeatMap, parse_band
+
+    try:
+        bands = [parse_band(band) for band in bands]
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint="--band")
 
     label_manager = LabelManager(toggle_input_transparency=True)
 
-    get_text = get_text_fn(google_trans)
+    ocr = ctx.make_ocr()
+
+    # Captures on key presses only search the bands and learned regions, continuous
+    # captures already only process what changed
+    region_ocr = ocr
+    if len(bands) > 0 or learn_regions:
+        region_ocr = HotRegionOCR(
+            ocr, bands, TextHeatMap.load(heat_map_path) if learn_regions else None, heat_map_path, rescan_interval)
+
+    get_texts = get_text_fn(google_trans)
 
     stop = False
 
+    def _continuous_loop(monitor):
+        """Captures and processes frames until the toggle key is pressed.
+        Capture, detection, recognition, translation and updating the UI
+        run concurrently on consecutive frames."""
+        incremental_ocr = IncrementalOCR(ocr)
+        toggled = Event()
+        hotkey = keyboard.add_hotkey(toggle_key, toggled.set)
+
+        # The frames in the queues and stages of the pipeline must not be overwritten while capturing
+        captures = []
+        previous_results = [None]
+
+        def _capture():
+            # mss can only capture on the thread it was created on
+            if len(captures) == 0:
+                captures.append(ScreenCapture(mss.mss(), ctx.max_height, ring_size=6))
+            return captures[0].grab(monitor)
+
+        def _detect(frame):
+            image, screen_shape = frame
+            return image, screen_shape, incremental_ocr.detect(image)
+
+        def _recognize(frame):
+            image, screen_shape, detection = frame
+            result, _ = incremental_ocr.recognize(image, detection)
+            return result, [screen_shape[0] / image.shape[0], screen_shape[1] / image.shape[1]]
+
+        def _translate(frame):
+            results = translate_results(*frame, ctx.translation_cache)
+            if results == previous_results[0]:
+                return None
+            previous_results[0] = results
+            return results, get_texts(results)
+
+        def _update(frame):
+            results, texts = frame
+            print("Updating UI")
+            label_manager.reset()
+            for result, (text, tooltip) in zip(results, texts):
+                label_manager.add(result["position"], text, tooltip)
+
+        pipeline = Pipeline(Stage("capture", _capture), [
+            Stage("detection", _detect),
+            Stage("recognition", _recognize),
+            Stage("translation", _translate),
+            Stage("ui", _update),
+        ], interval=1 / capture_fps)
+        pipeline.start()
+        while not toggled.wait(0.1) and not stop:
+            pass
+        pipeline.stop()
+        print("Pipeline:", pipeline.stats())
+
+        keyboard.remove_hotkey(hotkey)
+
     def _loop():
         sct = mss.mss()
-        tic_toc = TicToc()
+        capture = ScreenCapture(sct, ctx.max_height)
 
         monitor = sct.monitors[monitor_id]
 
@@ -207,22 +604,28 @@ def ui(ctx, toggle_key, monitor_id, monitor_bounds, google_trans):
 
             keyboard.wait(toggle_key)
 
+            if capture_fps is not None:
+                print("Capturing continuously")
+                _continuous_loop(monitor)
+                print("Resetting")
+                label_manager.reset()
+                time.sleep(0.1)
+                continue
+
             print("Getting screenshot")
-            image = get_screenshot(sct, monitor)
+            image, screen_shape = capture.grab(monitor)
+            print(image.shape)
 
             print("Processing")
-            results = asyncio.run(get_ocr_results(
-                ctx.ocr, image, ctx.max_height))
+            results = run_ocr(region_ocr, image, ctx.max_height, ctx.translation_cache, screen_shape=screen_shape)
 
             print("Updating UI")
-            for result in results:
+            for result, (text, tooltip) in zip(results, get_texts(results)):
                 result["position"] = (
                     result["position"][0],
                     result["position"][1]
                 )
 
-                text, tooltip = get_text(result)
-
                 label_manager.add(result["position"], text, tooltip)
 
             print("Waiting")
@@ -238,11 +641,17 @@ def ui(ctx, toggle_key, monitor_id, monitor_bounds, google_trans):
     thread.start()
     exit_code = label_manager.start()
     print("Done")
+    if ctx.translation_cache is not None:
+        print("Translation cache:", ctx.translation_cache.stats())
+    if learn_regions:
+        region_ocr.save()
     stop = True
     print("Exiting")
     sys.exit(exit_code)
 
 
 if __name__ == "__main__":
+    # Lets the worker processes of the frozen executable run their target instead of the CLI
+    multiprocessing.freeze_support()
     logging.basicConfig(level=logging.DEBUG)
     main()
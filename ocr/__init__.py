@@ -1 +1,23 @@
-from .ocr import OCR, make_default_ocr
\ No newline at end of file
+import importlib
+
+# The classes are imported on first use so that processes which do not
+# run the networks themselves never load onnxruntime and OpenCV
+_exports = {
+    "OCR": ".ocr",
+    "make_default_ocr": ".ocr",
+    "IncrementalOCR": ".incremental",
+    "RegionOCR": ".regions",
+    "HotRegionOCR": ".hotspots",
+    "BatchScheduler": ".scheduler",
+    "WorkerPool": ".workers",
+}
+
+
+def __getattr__(name):
+    if name not in _exports:
+        raise AttributeError("module %r has no attribute %r" % (__name__, name))
+    return getattr(importlib.import_module(_exports[name], __name__), name)
+
+
+def __dir__():
+    return sorted(list(globals()) + list(_exports))
\ No newline at end of file
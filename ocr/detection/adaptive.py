@@ -0,0 +1,98 @@
+import logging
+from collections import deque
+import cv2
+import numpy as np
+from .cptn import expand_text_lines
+
+logger = logging.getLogger(__name__)
+
+
+def line_heights(text):
+    """Returns the heights of text lines given as rows of four corner points."""
+    return ((text[:, 5] - text[:, 1]) + (text[:, 7] - text[:, 3])) / 2
+
+
+class AdaptiveScaleDetector:
+    """Detects text on a downscaled image using another detector. The scale
+    follows the heights of the text lines of recent detections so that the
+    smallest text stays target_height pixels high at the detection scale.
+
+    The scale is raised as soon as text gets too small but only lowered once
+    it could drop by more than the hysteresis, so it does not flicker between
+    frames. A detection without text lines and every rescan_interval-th
+    detection run at max_scale so that text too small for the current scale
+    is not missed."""
+
+    percentile = 10
+    min_size = 64
+
+    def __init__(self, detector, target_height=24, min_scale=0.25, max_scale=1.0, hysteresis=0.25,
+                 history=10, rescan_interval=10):
+        if not 0 < min_scale <= max_scale:
+            raise ValueError("Scales must satisfy 0 < min_scale <= max_scale")
+        self.detector = detector
+        self.target_height = target_height
+        self.min_scale = min_scale
+        self.max_scale = max_scale
+        self.hysteresis = hysteresis
+        self.rescan_interval = rescan_interval
+        self.heights = deque(maxlen=history)
+        self.scale = max_scale
+        self.detections = 0
+
+    def reset(self):
+        """Forgets the recent text heights so the next image is detected at max_scale."""
+        self.heights.clear()
+        self.scale = self.max_scale
+        self.detections = 0
+
+    def detection_scale(self, image_shape):
+        """Returns the scale to detect an image of the shape at."""
+        scale = self.scale
+        if self.rescan_interval and self.detections % self.rescan_interval == 0:
+            scale = self.max_scale
+        # Small images such as changed regions are not shrunk below the size of a few anchors
+        return min(self.max_scale, max(scale, self.min_size / min(image_shape[:2])))
+
+    def observe(self, text, scale):
+        """Updates the scale from the heights of the text lines detected at scale."""
+        if len(text) == 0:
+            if scale < self.max_scale:
+                self.scale = self.max_scale
+            return
+
+        self.heights.append(np.percentile(line_heights(text), self.percentile))
+        desired = self.target_height / max(1.0, min(self.heights))
+        desired = min(self.max_scale, max(self.min_scale, desired))
+
+        if desired > self.scale or desired < self.scale * (1 - self.hysteresis):
+            logger.debug("Detection scale: %.2f -> %.2f", self.scale, desired)
+            self.scale = desired
+
+    def detect(self, image, expand=True):
+        h, w = image.shape[:2]
+        scale = self.detection_scale(image.shape)
+        self.detections += 1
+
+        if scale == 1:
+            text, _, _ = self.detector.detect(image, expand=False)
+        else:
+            size = (max(1, int(round(w * scale))), max(1, int(round(h * scale))))
+            interpolation = cv2.INTER_AREA if scale < 1 else cv2.INTER_LINEAR
+            small = cv2.resize(image, size, interpolation=interpolation)
+            text, _, _ = self.detector.detect(small, expand=False)
+
+            # Move text lines to image coordinates
+            text[:, 0:8:2] *= w / size[0]
+            text[:, 1:8:2] *= h / size[1]
+
+        self.observe(text, scale)
+
+        if expand:
+            expand_text_lines(text, w)
+
+        return text, image, image
+
+    def detect_batch(self, images, expand=True):
+        """Detects text lines in multiple images one after another."""
+        return [self.detect(image, expand)[0] for image in images]
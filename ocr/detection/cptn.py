@@ -1,43 +1,98 @@
 from time import time
 import numpy as np
-import onnxruntime as rt
-from .utils import gen_anchor, bbox_transfor_inv, clip_box, filter_bbox, nms, TextProposalConnectorOriented, softmax
+from .utils import gen_anchor, bbox_transfor_inv, clip_box, filter_bbox, TextProposalConnectorOriented, softmax
+from .nms import nms
+from ..metrics import metrics
+from ..session import create_session, SessionRunner
+
+
+def expand_text_lines(text, w, margin=10):
+    """Widens text lines horizontally by margin pixels
+    within an image of width w."""
+    text[:, 0] = np.maximum(text[:, 0] - margin, 0)
+    text[:, 2] = np.minimum(text[:, 2] + margin, w - 1)
+    text[:, 4] = np.maximum(text[:, 4] - margin, 0)
+    text[:, 6] = np.minimum(text[:, 6] + margin, w - 1)
+    return text
 
 
 class CPTNDetector:
     """Detect areas of potential texts."""
 
     prob_thresh = 0.5
+    nms_backend = "auto"
+    max_batch_size = 4
     image_mean = np.array([123.68, 116.779, 103.939], dtype=np.float32)
 
-    def __init__(self, model_path, execution_providers):
-        session_opts = rt.SessionOptions()
-        session_opts.graph_optimization_level = rt.GraphOptimizationLevel.ORT_ENABLE_ALL
-        session_opts.enable_mem_pattern = False
-        self.session = rt.InferenceSession(model_path, session_opts)
-        self.session.set_providers(execution_providers)
+    def __init__(self, model_path, execution_providers, intra_op_threads=None, optimized_model_dir=None,
+                 io_binding=False):
+        self.session = create_session(model_path, execution_providers, intra_op_threads, optimized_model_dir)
+        self.runner = SessionRunner(self.session, io_binding)
+
+        # Models exported with a fixed batch size can only run one image at a time
+        batch_dim = self.session.get_inputs()[0].shape[0]
+        if isinstance(batch_dim, int):
+            self.max_batch_size = batch_dim
+
+    def preprocess(self, image, out=None):
+        """Converts an RGB image to a mean-subtracted
+        float tensor of shape (3, H, W), written into out if given."""
+        if out is None:
+            out = np.empty((3,) + image.shape[:2], np.float32)
+        # Subtracting in channel-first order casts and transposes in a single pass
+        np.subtract(image.transpose(2, 0, 1), self.image_mean[:, np.newaxis, np.newaxis], out=out)
+        return out
 
     def detect(self, image, expand=True):
-        image_r = image.copy()
-        image_c = image.copy()
+        """Detects text lines in an image. The image is returned twice
+        in place of the framed and the rotated image."""
         h, w = image.shape[:2]
-        image = image.astype(np.float32) - self.image_mean
-        image = np.expand_dims(image.transpose(2, 0, 1), 0)
+        batch = self.runner.input((1, 3, h, w))
+        self.preprocess(image, out=batch[0])
+
+        with metrics.stage("detection_inference"):
+            cls, regr = self.runner.run(batch)
+
+        with metrics.stage("detection_postprocess"):
+            text = self.postprocess(cls, regr, h, w, expand)
 
-        cls, regr = self.session.run(None, {"images": image})
+        return text, image, image
 
+    def detect_batch(self, images, expand=True):
+        """Detects text lines in multiple images of the same shape.
+        The images are stacked so that every max_batch_size images
+        only require a single inference. Returns the text lines
+        of every image."""
+        texts = []
+        for start in range(0, len(images), self.max_batch_size):
+            batch_images = images[start:start + self.max_batch_size]
+            h, w = batch_images[0].shape[:2]
+            batch = self.runner.input((len(batch_images), 3, h, w))
+            for index, image in enumerate(batch_images):
+                self.preprocess(image, out=batch[index])
+
+            with metrics.stage("detection_inference"):
+                cls, regr = self.runner.run(batch)
+
+            for index in range(len(batch_images)):
+                with metrics.stage("detection_postprocess"):
+                    texts.append(self.postprocess(
+                        cls[index:index + 1], regr[index:index + 1], h, w, expand))
+        return texts
+
+    def postprocess(self, cls, regr, h, w, expand=True):
+        """Turns the network outputs for an image of size (h, w)
+        into text lines."""
         cls_prob = softmax(cls, axis=-1)
 
+        # Only decode the boxes of foreground anchors
+        fg = np.where(cls_prob[0, :, 1] > self.prob_thresh)[0]
         anchor = gen_anchor((int(h / 16), int(w / 16)), 16)
-        bbox = bbox_transfor_inv(anchor, regr)
+        bbox = bbox_transfor_inv(anchor[fg], regr[:, fg])
         bbox = clip_box(bbox, [h, w])
-        # print(bbox.shape)
 
-        fg = np.where(cls_prob[0, :, 1] > self.prob_thresh)[0]
-        # print(np.max(cls_prob[0, :, 1]))
-        select_anchor = bbox[fg, :]
+        select_anchor = bbox.astype(np.int32)
         select_score = cls_prob[0, fg, 1]
-        select_anchor = select_anchor.astype(np.int32)
         # print(select_anchor.shape)
         keep_index = filter_bbox(select_anchor, 16)
 
@@ -46,7 +101,7 @@ class CPTNDetector:
         select_score = select_score[keep_index]
         select_score = np.reshape(select_score, (select_score.shape[0], 1))
         nmsbox = np.hstack((select_anchor, select_score))
-        keep = nms(nmsbox, 0.3)
+        keep = nms(nmsbox, 0.3, self.nms_backend)
         # print(keep)
         select_anchor = select_anchor[keep]
         select_score = select_score[keep]
@@ -57,10 +112,6 @@ class CPTNDetector:
 
         # expand text
         if expand:
-            for idx in range(len(text)):
-                text[idx][0] = max(text[idx][0] - 10, 0)
-                text[idx][2] = min(text[idx][2] + 10, w - 1)
-                text[idx][4] = max(text[idx][4] - 10, 0)
-                text[idx][6] = min(text[idx][6] + 10, w - 1)
+            expand_text_lines(text, w)
 
-        return text, image_c, image_r
+        return text
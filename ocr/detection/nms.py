@@ -0,0 +1,135 @@
+import numpy as np
+import cv2
+
+
+def _areas(dets):
+    return (dets[:, 2] - dets[:, 0] + 1) * (dets[:, 3] - dets[:, 1] + 1)
+
+
+def _order(dets):
+    """Returns the box indices by descending score."""
+    return dets[:, 4].argsort()[::-1]
+
+
+def _overlaps(dets, areas, index1, index2):
+    """Returns the iou between the boxes index1 and index2
+    where the box coordinates are inclusive."""
+    xx1 = np.maximum(dets[index1, 0], dets[index2, 0])
+    yy1 = np.maximum(dets[index1, 1], dets[index2, 1])
+    xx2 = np.minimum(dets[index1, 2], dets[index2, 2])
+    yy2 = np.minimum(dets[index1, 3], dets[index2, 3])
+
+    w = np.maximum(0.0, xx2 - xx1 + 1)
+    h = np.maximum(0.0, yy2 - yy1 + 1)
+    inter = w * h
+    return inter / (areas[index1] + areas[index2] - inter)
+
+
+def _greedy(order, suppressed_by):
+    """Keeps boxes in order unless suppressed by an already kept box.
+    suppressed_by(rank) returns the ranks of boxes suppressed
+    by the box at the given rank."""
+    suppressed = np.zeros(len(order), bool)
+    keep = []
+    for rank in range(len(order)):
+        if suppressed[rank]:
+            continue
+        keep.append(order[rank])
+        suppressed[suppressed_by(rank)] = True
+    return np.array(keep, np.int64)
+
+
+def nms_matrix(dets, thresh):
+    """Computes the iou between all pairs of boxes at once.
+    Uses O(N^2) time and memory so it only suits few boxes."""
+    order = _order(dets)
+    dets = dets[order]
+    areas = _areas(dets)
+    index = np.arange(len(dets))
+    ovr = _overlaps(dets, areas, index[:, np.newaxis], index[np.newaxis, :])
+    suppresses = np.triu(ovr > thresh, k=1)
+
+    return _greedy(order, lambda rank: suppresses[rank])
+
+
+def nms_columns(dets, thresh):
+    """Splits the boxes into columns that overlap too little horizontally
+    for an iou above thresh, such as the 16 pixel wide proposals of the
+    detector. The highest remaining box of every column is kept at once,
+    so there are only as many steps as boxes are kept per column.
+    Requires thresh >= 0."""
+    order = _order(dets)
+    dets = dets[order]
+    areas = _areas(dets)
+
+    # The iou is at most the horizontal overlap divided by the wider box, so a box
+    # starts a new column if it overlaps every box left of it by at most thresh * min width
+    by_x = np.argsort(dets[:, 0], kind="stable")
+    max_x2 = np.maximum.accumulate(dets[by_x, 2])
+    min_width = (dets[:, 2] - dets[:, 0] + 1).min()
+    starts = np.concatenate(([True], max_x2[:-1] - dets[by_x[1:], 0] + 1 <= thresh * min_width))
+    column = np.empty(len(dets), np.int64)
+    column[by_x] = np.cumsum(starts)
+
+    # Remaining boxes ordered by column and then by rank
+    ranks = np.lexsort((np.arange(len(dets)), column))
+    columns = column[ranks]
+    keep = np.zeros(len(dets), bool)
+    while len(ranks) > 0:
+        first = np.concatenate(([True], columns[1:] != columns[:-1]))
+        keep[ranks[first]] = True
+        heads = ranks[first][np.cumsum(first) - 1]
+        remaining = ~first & (_overlaps(dets, areas, heads, ranks) <= thresh)
+        ranks, columns = ranks[remaining], columns[remaining]
+
+    return order[keep]
+
+
+def nms_loop(dets, thresh):
+    """Keeps the highest remaining box and filters the remaining boxes
+    by their iou with it until no boxes remain."""
+    order = _order(dets)
+    areas = _areas(dets)
+
+    keep = []
+    while order.size > 0:
+        i = order[0]
+        keep.append(i)
+        ovr = _overlaps(dets, areas, i, order[1:])
+        order = order[np.where(ovr <= thresh)[0] + 1]
+    return np.array(keep, np.int64)
+
+
+def nms_opencv(dets, thresh):
+    """Uses cv2.dnn.NMSBoxes which drops boxes without a positive
+    score. Boxes with equal scores may be visited in a different
+    order than in the other backends."""
+    rects = np.stack((
+        dets[:, 0], dets[:, 1],
+        dets[:, 2] - dets[:, 0] + 1, dets[:, 3] - dets[:, 1] + 1
+    ), axis=1)
+    scores = dets[:, 4]
+    keep = cv2.dnn.NMSBoxes(rects.tolist(), scores.tolist(), 0.0, thresh)
+    return np.array(keep, np.int64).reshape(-1)
+
+
+NMS_BACKENDS = {
+    "loop": nms_loop,
+    "matrix": nms_matrix,
+    "columns": nms_columns,
+    "opencv": nms_opencv,
+}
+
+
+def nms(dets, thresh, backend="auto"):
+    """Greedy non-maximum suppression of boxes given as rows of
+    (x1, y1, x2, y2, score). Returns the indices of the kept boxes
+    by descending score. The backend is one of NMS_BACKENDS or
+    auto to use columns, or loop if thresh is negative."""
+    if len(dets) == 0:
+        return np.zeros(0, np.int64)
+
+    if backend == "auto":
+        backend = "columns" if thresh >= 0 else "loop"
+
+    return NMS_BACKENDS[backend](dets, thresh)
@@ -0,0 +1,111 @@
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from .cptn import expand_text_lines
+
+
+def tile_origins(length, tile_size, overlap):
+    """Returns the start positions of tiles of tile_size that cover length
+    where neighboring tiles overlap by at least overlap pixels."""
+    if length <= tile_size:
+        return [0]
+    origins = list(range(0, length - tile_size, tile_size - overlap))
+    origins.append(length - tile_size)
+    return origins
+
+
+def line_bounds(text):
+    """Returns the axis-aligned bounds (left, top, right, bottom)
+    of text lines given as rows of four corner points."""
+    return (
+        np.minimum(text[:, 0], text[:, 4]),
+        np.minimum(text[:, 1], text[:, 3]),
+        np.maximum(text[:, 2], text[:, 6]),
+        np.maximum(text[:, 5], text[:, 7])
+    )
+
+
+def merge_text_lines(text, tile_ids, min_v_overlap=0.5):
+    """Merges text lines of different tiles that overlap horizontally and
+    vertically by at least min_v_overlap of the smaller height, such as
+    lines that were cut at a tile seam. Merged lines are replaced by their
+    axis-aligned bounding box with the highest score of the merged lines."""
+    left, top, right, bottom = line_bounds(text)
+    heights = bottom - top + 1
+    v_overlap = (np.minimum(bottom[:, None], bottom[None]) - np.maximum(top[:, None], top[None]) + 1) / \
+        np.minimum(heights[:, None], heights[None])
+    h_overlap = np.minimum(right[:, None], right[None]) >= np.maximum(left[:, None], left[None])
+    connected = (v_overlap >= min_v_overlap) & h_overlap & (tile_ids[:, None] != tile_ids[None])
+
+    # Union connected lines, every group is labeled by its first line
+    labels = np.arange(len(text))
+    for i, j in zip(*np.nonzero(np.triu(connected, k=1))):
+        label_i, label_j = labels[i], labels[j]
+        if label_i != label_j:
+            labels[labels == max(label_i, label_j)] = min(label_i, label_j)
+
+    merged = []
+    for label in np.unique(labels):
+        group = np.where(labels == label)[0]
+        if len(group) == 1:
+            merged.append(text[group[0]])
+            continue
+        l, t, r, b = left[group].min(), top[group].min(), right[group].max(), bottom[group].max()
+        merged.append(np.array([l, t, r, t, l, b, r, b, text[group, 8].max()], text.dtype))
+
+    return np.array(merged, text.dtype).reshape(-1, text.shape[1])
+
+
+class TiledDetector:
+    """Detects text in overlapping tiles of an image using another detector
+    and merges the text lines across the tile seams. The memory of a
+    detection is bounded by the tile size regardless of the image size."""
+
+    def __init__(self, detector, tile_size, overlap, workers=1):
+        if overlap >= tile_size:
+            raise ValueError("Tile overlap must be smaller than the tile size")
+        self.detector = detector
+        self.tile_size = tile_size
+        self.overlap = overlap
+        self.workers = workers
+        self.executor = ThreadPoolExecutor(workers) if workers > 1 else None
+
+    def detect(self, image, expand=True):
+        h, w = image.shape[:2]
+        tile_h, tile_w = min(self.tile_size, h), min(self.tile_size, w)
+        origins = [
+            (y, x)
+            for y in tile_origins(h, tile_h, self.overlap)
+            for x in tile_origins(w, tile_w, self.overlap)
+        ]
+        tiles = [image[y:y + tile_h, x:x + tile_w] for y, x in origins]
+
+        # All tiles have the same shape so they can be batched,
+        # concurrent workers each detect a contiguous part of the tiles
+        if self.executor is None:
+            texts = self.detector.detect_batch(tiles, expand=False)
+        else:
+            parts = np.array_split(np.arange(len(tiles)), min(self.workers, len(tiles)))
+            texts = [
+                text
+                for part_texts in self.executor.map(
+                    lambda part: self.detector.detect_batch([tiles[i] for i in part], expand=False), parts)
+                for text in part_texts
+            ]
+
+        # Move text lines to image coordinates
+        tile_ids = []
+        for tile_id, ((y, x), text) in enumerate(zip(origins, texts)):
+            text[:, 0:8:2] += x
+            text[:, 1:8:2] += y
+            tile_ids += [tile_id] * len(text)
+
+        text = merge_text_lines(np.concatenate(texts), np.array(tile_ids))
+
+        if expand:
+            expand_text_lines(text, w)
+
+        return text, image, image
+
+    def detect_batch(self, images, expand=True):
+        """Detects text lines in multiple images one after another."""
+        return [self.detect(image, expand)[0] for image in images]
@@ -1,3 +1,4 @@
+from functools import lru_cache
 import numpy as np
 import cv2
 
@@ -39,10 +40,12 @@ def resize(image, width=None, height=None, inter=cv2.INTER_AREA):
     return resized
 
 
+@lru_cache(maxsize=16)
 def gen_anchor(featuresize, scale):
     """
         gen base anchor from feature map [HXW][9][4]
         reshape  [HXW][9][4] to [HXWX9][4]
+        the result is cached per feature map size and must not be modified
     """
     heights = [11, 16, 23, 33, 48, 68, 97, 139, 198, 283]
     widths = [16, 16, 16, 16, 16, 16, 16, 16, 16, 16]
@@ -66,12 +69,13 @@ def gen_anchor(featuresize, scale):
     h, w = featuresize
     shift_x = np.arange(0, w) * scale
     shift_y = np.arange(0, h) * scale
-    # apply shift
-    anchor = []
-    for i in shift_y:
-        for j in shift_x:
-            anchor.append(base_anchor + [j, i, j, i])
-    return np.array(anchor).reshape((-1, 4))
+    # apply shift, rows first then columns
+    shift_x, shift_y = np.meshgrid(shift_x, shift_y)
+    shifts = np.stack((shift_x, shift_y, shift_x, shift_y), axis=-1)
+    anchor = shifts[:, :, np.newaxis, :] + base_anchor
+    anchor = anchor.reshape((-1, 4))
+    anchor.flags.writeable = False
+    return anchor
 
 
 def bbox_transfor_inv(anchor, regr):
@@ -118,49 +122,27 @@ def filter_bbox(bbox, minsize):
     return keep
 
 
-def nms(dets, thresh):
-    x1 = dets[:, 0]
-    y1 = dets[:, 1]
-    x2 = dets[:, 2]
-    y2 = dets[:, 3]
-    scores = dets[:, 4]
-
-    areas = (x2 - x1 + 1) * (y2 - y1 + 1)
-    order = scores.argsort()[::-1]
-
-    keep = []
-    while order.size > 0:
-        i = order[0]
-        keep.append(i)
-        xx1 = np.maximum(x1[i], x1[order[1:]])
-        yy1 = np.maximum(y1[i], y1[order[1:]])
-        xx2 = np.minimum(x2[i], x2[order[1:]])
-        yy2 = np.minimum(y2[i], y2[order[1:]])
-
-        w = np.maximum(0.0, xx2 - xx1 + 1)
-        h = np.maximum(0.0, yy2 - yy1 + 1)
-        inter = w * h
-        ovr = inter / (areas[i] + areas[order[1:]] - inter)
-
-        inds = np.where(ovr <= thresh)[0]
-        order = order[inds + 1]
-    return keep
-
-
 # for predict
 class Graph:
-    def __init__(self, graph):
-        self.graph = graph
+    """
+        Text proposal graph where every proposal has at most one successor.
+        successors[i] is the index of the successor of proposal i or -1.
+    """
+
+    def __init__(self, successors):
+        self.successors = successors
 
     def sub_graphs_connected(self):
+        has_precursor = np.zeros(len(self.successors), bool)
+        has_precursor[self.successors[self.successors >= 0]] = True
+        starts = np.where((self.successors >= 0) & ~has_precursor)[0]
+
         sub_graphs = []
-        for index in range(self.graph.shape[0]):
-            if not self.graph[:, index].any() and self.graph[index, :].any():
-                v = index
-                sub_graphs.append([v])
-                while self.graph[v, :].any():
-                    v = np.where(self.graph[v, :])[0][0]
-                    sub_graphs[-1].append(v)
+        for v in starts:
+            sub_graphs.append([v])
+            while self.successors[v] >= 0:
+                v = self.successors[v]
+                sub_graphs[-1].append(v)
         return sub_graphs
 
 
@@ -183,75 +165,66 @@ class TextProposalGraphBuilder:
         Build Text proposals into a graph.
     """
 
-    def get_successions(self, index):
-        box = self.text_proposals[index]
-        results = []
-        for left in range(int(box[0]) + 1, min(int(box[0]) + TextLineCfg.MAX_HORIZONTAL_GAP + 1, self.im_size[1])):
-            adj_box_indices = self.boxes_table[left]
-            for adj_box_index in adj_box_indices:
-                if self.meet_v_iou(adj_box_index, index):
-                    results.append(adj_box_index)
-            if len(results) != 0:
-                return results
-        return results
-
-    def get_precursors(self, index):
-        box = self.text_proposals[index]
-        results = []
-        for left in range(int(box[0]) - 1, max(int(box[0] - TextLineCfg.MAX_HORIZONTAL_GAP), 0) - 1, -1):
-            adj_box_indices = self.boxes_table[left]
-            for adj_box_index in adj_box_indices:
-                if self.meet_v_iou(adj_box_index, index):
-                    results.append(adj_box_index)
-            if len(results) != 0:
-                return results
-        return results
-
-    def is_succession_node(self, index, succession_index):
-        precursors = self.get_precursors(succession_index)
-        if self.scores[index] >= np.max(self.scores[precursors]):
-            return True
-        return False
+    def get_neighbor_pairs(self):
+        """
+            return all pairs (left, right) of proposals where right starts at most
+            MAX_HORIZONTAL_GAP pixels to the right of left and both meet the vertical iou
+        """
+        n = len(self.columns)
+        order = np.argsort(self.columns, kind="stable")
+        sorted_columns = self.columns[order]
 
-    def meet_v_iou(self, index1, index2):
-        def overlaps_v(index1, index2):
-            h1 = self.heights[index1]
-            h2 = self.heights[index2]
-            y0 = max(self.text_proposals[index2][1], self.text_proposals[index1][1])
-            y1 = min(self.text_proposals[index2][3], self.text_proposals[index1][3])
-            return max(0, y1 - y0 + 1) / min(h1, h2)
+        # proposals to the right of each proposal form a contiguous range in the sorted order
+        lo = np.searchsorted(sorted_columns, self.columns, side="right")
+        hi = np.searchsorted(sorted_columns, self.columns + TextLineCfg.MAX_HORIZONTAL_GAP, side="right")
+        counts = hi - lo
+        left = np.repeat(np.arange(n), counts)
+        offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        right = order[np.repeat(lo, counts) + offsets]
 
-        def size_similarity(index1, index2):
-            h1 = self.heights[index1]
-            h2 = self.heights[index2]
-            return min(h1, h2) / max(h1, h2)
+        keep = self.meet_v_iou(left, right)
+        return left[keep], right[keep]
 
-        return overlaps_v(index1, index2) >= TextLineCfg.MIN_V_OVERLAPS and \
-               size_similarity(index1, index2) >= TextLineCfg.MIN_SIZE_SIM
+    def meet_v_iou(self, index1, index2):
+        h1 = self.heights[index1]
+        h2 = self.heights[index2]
+        y0 = np.maximum(self.text_proposals[index2, 1], self.text_proposals[index1, 1])
+        y1 = np.minimum(self.text_proposals[index2, 3], self.text_proposals[index1, 3])
+        overlaps_v = np.maximum(0, y1 - y0 + 1) / np.minimum(h1, h2)
+        size_similarity = np.minimum(h1, h2) / np.maximum(h1, h2)
+
+        return (overlaps_v >= TextLineCfg.MIN_V_OVERLAPS) & \
+               (size_similarity >= TextLineCfg.MIN_SIZE_SIM)
 
     def build_graph(self, text_proposals, scores, im_size):
         self.text_proposals = text_proposals
-        self.scores = scores
+        self.scores = scores.reshape(-1)
         self.im_size = im_size
         self.heights = text_proposals[:, 3] - text_proposals[:, 1] + 1
-
-        boxes_table = [[] for _ in range(self.im_size[1])]
-        for index, box in enumerate(text_proposals):
-            boxes_table[int(box[0])].append(index)
-        self.boxes_table = boxes_table
-
-        graph = np.zeros((text_proposals.shape[0], text_proposals.shape[0]), np.bool)
-
-        for index, box in enumerate(text_proposals):
-            successions = self.get_successions(index)
-            if len(successions) == 0:
-                continue
-            succession_index = successions[np.argmax(scores[successions])]
-            if self.is_succession_node(index, succession_index):
-                # NOTE: a box can have multiple successions(precursors) if multiple successions(precursors)
-                # have equal scores.
-                graph[index, succession_index] = True
-        return Graph(graph)
+        self.columns = text_proposals[:, 0].astype(np.int64)
+
+        successors = np.full(text_proposals.shape[0], -1, np.int64)
+        left, right = self.get_neighbor_pairs()
+        if len(left) == 0:
+            return Graph(successors)
+
+        # successions of a proposal are the neighbors in the nearest column to its right,
+        # the succession with the highest score (first index on ties) is chosen
+        order = np.lexsort((right, -self.scores[right], self.columns[right], left))
+        indices, first = np.unique(left[order], return_index=True)
+        succession_indices = right[order][first]
+
+        # precursors of a proposal are the neighbors in the nearest column to its left
+        order = np.lexsort((-self.scores[left], -self.columns[left], right))
+        precursor_owners, first = np.unique(right[order], return_index=True)
+        max_precursor_scores = np.zeros(text_proposals.shape[0], self.scores.dtype)
+        max_precursor_scores[precursor_owners] = self.scores[left[order][first]]
+
+        # NOTE: a box can have multiple successions(precursors) if multiple successions(precursors)
+        # have equal scores.
+        is_succession_node = self.scores[indices] >= max_precursor_scores[succession_indices]
+        successors[indices[is_succession_node]] = succession_indices[is_succession_node]
+        return Graph(successors)
 
 
 class TextProposalConnectorOriented:
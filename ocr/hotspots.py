@@ -0,0 +1,165 @@
+import logging
+import os
+
+import numpy as np
+
+from .ocr import sort_box
+from .regions import clip_regions
+from .incremental import rec_bounds, merge_regions
+
+logger = logging.getLogger(__name__)
+
+# Band sides and the fractional bounds (left, top, right, bottom) of a band of a given size
+BAND_SIDES = {
+    "top": lambda size: (0, 0, 1, size),
+    "bottom": lambda size: (0, 1 - size, 1, 1),
+    "left": lambda size: (0, 0, size, 1),
+    "right": lambda size: (1 - size, 0, 1, 1),
+}
+
+
+def parse_band(text):
+    """Parses a band of the screen such as "bottom 20%" into fractional
+    bounds (left, top, right, bottom)."""
+    parts = text.lower().split()
+    if len(parts) != 2 or parts[0] not in BAND_SIDES or not parts[1].endswith("%"):
+        raise ValueError('Bands need a side (%s) and a percentage such as "bottom 20%%"' % ", ".join(BAND_SIDES))
+    size = float(parts[1][:-1]) / 100
+    if not 0 < size <= 1:
+        raise ValueError("Band percentages must be within (0, 100]")
+    return BAND_SIDES[parts[0]](size)
+
+
+def band_region(band, image_shape):
+    """Returns the region (left, top, right, bottom) of fractional bounds in an image."""
+    h, w = image_shape[:2]
+    left, top, right, bottom = band
+    return int(left * w), int(top * h), int(np.ceil(right * w)), int(np.ceil(bottom * h))
+
+
+class TextHeatMap:
+    """Counts where text was found on a grid over the image that is
+    independent of the image resolution. Older counts decay so that the
+    map follows where text appears now."""
+
+    def __init__(self, rows=18, columns=32, decay=0.99):
+        self.heat = np.zeros((rows, columns), np.float32)
+        self.decay = decay
+
+    @classmethod
+    def load(cls, path, **kwargs):
+        """Loads the map saved at the path or returns an empty map if there is none."""
+        heat_map = cls(**kwargs)
+        if path is not None and os.path.exists(path):
+            heat = np.load(path)
+            if heat.shape == heat_map.heat.shape:
+                heat_map.heat = heat.astype(np.float32)
+        return heat_map
+
+    def save(self, path):
+        # Written to a temporary file first so the map is never left partially written
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        temp_path = "%s.%d.tmp" % (path, os.getpid())
+        with open(temp_path, "wb") as f:
+            np.save(f, self.heat)
+        os.replace(temp_path, path)
+
+    def add(self, text_recs, image_shape):
+        """Decays the map and adds the cells covered by the text lines of an image."""
+        h, w = image_shape[:2]
+        rows, columns = self.heat.shape
+        self.heat *= self.decay
+        for rec in text_recs:
+            left, top, right, bottom = rec_bounds(rec)
+            self.heat[
+                max(0, int(top / h * rows)):min(rows, int(bottom / h * rows) + 1),
+                max(0, int(left / w * columns)):min(columns, int(right / w * columns) + 1)
+            ] += 1
+
+    def hot_bands(self, min_heat=0.5):
+        """Returns the fractional bounds of full-width bands around the hot
+        cells. Text lines are horizontal so the bands keep lines of varying
+        length whole. Every band is grown by a row to catch moved lines."""
+        rows = self.heat.shape[0]
+        hot = self.heat.max(axis=1) >= min_heat
+        hot[1:] |= hot[:-1].copy()
+        hot[:-1] |= hot[1:].copy()
+
+        bands = []
+        start = None
+        for row, is_hot in enumerate(list(hot) + [False]):
+            if is_hot and start is None:
+                start = row
+            elif not is_hot and start is not None:
+                bands.append((0, start / rows, 1, row / rows))
+                start = None
+        return bands
+
+
+class HotRegionOCR:
+    """Runs OCR only within configured bands of the image and the bands
+    where the heat map learned that text appears. The whole image is
+    processed if there are no such bands and every rescan_interval-th
+    image so that text in new places is learned. Detection, recognition
+    and the results work like OCR so that it can replace an OCR."""
+
+    def __init__(self, ocr, bands=(), heat_map=None, heat_map_path=None, rescan_interval=10, min_heat=0.5):
+        self.ocr = ocr
+        self.bands = list(bands)
+        self.heat_map = heat_map
+        self.heat_map_path = heat_map_path
+        self.rescan_interval = rescan_interval
+        self.min_heat = min_heat
+        self.detections = 0
+        self.full_frame = False
+
+    def regions(self, image_shape):
+        """Returns the regions (left, top, right, bottom) to process in an
+        image of the shape or None if the whole image has to be processed."""
+        bands = list(self.bands)
+        if self.heat_map is not None:
+            if self.rescan_interval and self.detections % self.rescan_interval == 0:
+                return None
+            bands += self.heat_map.hot_bands(self.min_heat)
+        if len(bands) == 0:
+            return None
+        return merge_regions(clip_regions([band_region(band, image_shape) for band in bands], image_shape))
+
+    def detect(self, image):
+        """Returns the text lines detected in the regions of the image in
+        image coordinates, sorted from top to bottom."""
+        regions = self.regions(image.shape)
+        self.detections += 1
+        self.full_frame = regions is None
+        if regions is None:
+            logger.debug("Region OCR: full frame")
+            return self.ocr.detect(image)
+
+        logger.debug("Region OCR: %d regions", len(regions))
+        text_recs = []
+        for left, top, right, bottom in regions:
+            for rec in self.ocr.detect(image[top:bottom, left:right]):
+                rec = np.array(rec, np.float64)
+                rec[0:8:2] += left
+                rec[1:8:2] += top
+                text_recs.append(rec)
+        return sort_box(text_recs)
+
+    def recognize(self, image, text_recs):
+        """Recognizes the detected text lines of the image and
+        learns where the recognized text is."""
+        result = self.ocr.recognize(image, text_recs)
+        if self.heat_map is not None:
+            self.heat_map.add([rec for rec, _ in result.values()], image.shape)
+            # Saved after full frames as they are the ones that add new places
+            if self.full_frame:
+                self.save()
+        return result
+
+    def run(self, image):
+        return self.recognize(image, self.detect(image)), image
+
+    def save(self):
+        """Saves the heat map to heat_map_path."""
+        if self.heat_map is not None and self.heat_map_path is not None:
+            self.heat_map.save(self.heat_map_path)
@@ -0,0 +1,185 @@
+import logging
+
+import cv2
+import numpy as np
+
+from .regions import run_regions, offset_results, sort_results
+
+logger = logging.getLogger(__name__)
+
+
+def rec_bounds(rec):
+    """Returns the axis-aligned bounds (left, top, right, bottom)
+    of a text line given as four corner points."""
+    return (
+        min(rec[0], rec[4]), min(rec[1], rec[3]),
+        max(rec[2], rec[6]), max(rec[5], rec[7])
+    )
+
+
+def intersects(a, b):
+    """Returns whether two bounds (left, top, right, bottom) intersect."""
+    return a[0] <= b[2] and b[0] <= a[2] and a[1] <= b[3] and b[1] <= a[3]
+
+
+def union(a, b):
+    return (min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3]))
+
+
+def merge_regions(regions):
+    """Merges intersecting regions until all regions are disjoint."""
+    regions = list(regions)
+    merged = True
+    while merged:
+        merged = False
+        for i in range(len(regions)):
+            for j in range(i + 1, len(regions)):
+                if intersects(regions[i], regions[j]):
+                    regions[i] = union(regions[i], regions.pop(j))
+                    merged = True
+                    break
+            if merged:
+                break
+    return regions
+
+
+class IncrementalOCR:
+    """Runs OCR on consecutive frames of a continuous capture. Frames are
+    compared to the previous frame on a downsampled grid of blocks and OCR
+    only runs on the regions that changed while the results of the previous
+    frame are reused everywhere else."""
+
+    def __init__(self, ocr, block_size=32, threshold=16, max_changed_ratio=0.5):
+        self.ocr = ocr
+        self.block_size = block_size
+        self.threshold = threshold
+        self.max_changed_ratio = max_changed_ratio
+        self.reset()
+
+    def reset(self):
+        """Forgets the previous frame so the next frame is processed fully."""
+        self.previous_frame = None
+        self.previous_shape = None
+        self.results = []
+
+    def downsample(self, image):
+        """Returns a grayscale image with 4x4 pixels per block."""
+        h, w = image.shape[:2]
+        blocks_y = int(np.ceil(h / self.block_size))
+        blocks_x = int(np.ceil(w / self.block_size))
+        gray = cv2.cvtColor(image, cv2.COLOR_RGB2GRAY) if len(image.shape) == 3 else image
+        return cv2.resize(gray, (blocks_x * 4, blocks_y * 4), interpolation=cv2.INTER_AREA).astype(np.int16)
+
+    def changed_regions(self, frame, image_shape):
+        """Returns the changed regions as (left, top, right, bottom) in image
+        coordinates or None if the whole image has to be processed."""
+        changed = self.changed_blocks(frame, image_shape)
+        return None if changed is None else self.grow_regions(changed, image_shape)
+
+    def changed_blocks(self, frame, image_shape):
+        """Returns the regions of the changed blocks before they are grown by
+        the previous text lines or None if the whole image has to be processed."""
+        if self.previous_frame is None or self.previous_shape != image_shape:
+            return None
+
+        blocks_y, blocks_x = frame.shape[0] // 4, frame.shape[1] // 4
+        diff = np.abs(frame - self.previous_frame).reshape(blocks_y, 4, blocks_x, 4).max(axis=(1, 3))
+        changed = (diff > self.threshold).astype(np.uint8)
+        if changed.mean() > self.max_changed_ratio:
+            return None
+
+        # Grow the changed blocks by one block and group them into regions
+        changed = cv2.dilate(changed, np.ones((3, 3), np.uint8))
+        count, _, stats, _ = cv2.connectedComponentsWithStats(changed, connectivity=8)
+        scale_y, scale_x = image_shape[0] / blocks_y, image_shape[1] / blocks_x
+        return [
+            (x * scale_x, y * scale_y, (x + w) * scale_x - 1, (y + h) * scale_y - 1)
+            for x, y, w, h, _ in stats[1:count]
+        ]
+
+    def grow_regions(self, regions, image_shape):
+        """Grows changed regions by the previous text lines they intersect
+        and returns them as integer bounds clipped to the image."""
+        # Include previous text lines that are partially changed so they are not cut
+        for _ in range(2):
+            for rec, _ in self.results:
+                bounds = rec_bounds(rec)
+                regions = [union(region, bounds) if intersects(region, bounds) else region for region in regions]
+            regions = merge_regions(regions)
+
+        return [
+            (max(0, int(l)), max(0, int(t)), min(image_shape[1], int(np.ceil(r)) + 1), min(image_shape[0], int(np.ceil(b)) + 1))
+            for l, t, r, b in regions
+        ]
+
+    def next_regions(self, image):
+        """Returns the changed regions of the image compared to the previous
+        frame and makes the image the previous frame."""
+        changed = self.next_blocks(image)
+        return None if changed is None else self.grow_regions(changed, image.shape)
+
+    def next_blocks(self, image):
+        """Returns the changed blocks of next_regions before they are grown."""
+        frame = self.downsample(image)
+        changed = self.changed_blocks(frame, image.shape)
+        self.previous_frame = frame
+        self.previous_shape = image.shape
+        return changed
+
+    def unchanged_results(self, regions):
+        """Returns the previous text lines outside of the changed regions."""
+        return [
+            (rec, text) for rec, text in self.results
+            if not any(intersects(rec_bounds(rec), (l, t, r - 1, b - 1)) for l, t, r, b in regions)
+        ]
+
+    def run(self, image):
+        regions = self.next_regions(image)
+
+        if regions is None:
+            logger.debug("Incremental OCR: full frame")
+            result, _ = self.ocr.run(image)
+            self.results = list(result.values())
+        elif len(regions) > 0:
+            logger.debug("Incremental OCR: %d changed regions", len(regions))
+            self.results = self.unchanged_results(regions) + run_regions(self.ocr, image, regions)
+
+        return sort_results(self.results), image
+
+    def detect(self, image):
+        """Detects the text lines in the changed regions of the image.
+        Together with recognize this splits run into two steps that can
+        run concurrently for consecutive frames as long as every frame
+        is recognized in order. Requires the wrapped OCR to be an OCR.
+
+        While a frame is detected the previous frame may still be recognized,
+        so the regions are grown by the text lines known at this point and
+        recognize grows them again by the lines of the previous frame."""
+        changed = self.next_blocks(image)
+        if changed is None:
+            return None, self.ocr.detect(image)
+        regions = self.grow_regions(changed, image.shape)
+        return changed, {(l, t, r, b): self.ocr.detect(image[t:b, l:r]) for l, t, r, b in regions}
+
+    def recognize(self, image, detection):
+        """Recognizes the text lines returned by detect for the image
+        and returns the result of run."""
+        changed, text_recs = detection
+
+        if changed is None:
+            self.results = list(self.ocr.recognize(image, text_recs).values())
+            return sort_results(self.results), image
+
+        # Regions that grew by lines of the previous frame are detected again
+        regions = self.grow_regions(changed, image.shape)
+        if len(regions) > 0:
+            results = self.unchanged_results(regions)
+            for left, top, right, bottom in regions:
+                recs = text_recs.get((left, top, right, bottom))
+                if recs is None:
+                    recs = self.ocr.detect(image[top:bottom, left:right])
+                result = self.ocr.recognize(image[top:bottom, left:right], recs)
+                results += offset_results(result, left, top)
+            self.results = results
+
+        return sort_results(self.results), image
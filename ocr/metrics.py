@@ -0,0 +1,139 @@
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from time import perf_counter
+
+
+# Upper bounds in seconds of the latency histogram buckets
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+class Histogram:
+    """Counts observed values in buckets and keeps their sum."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect_left(self.buckets, value)
+        with self.lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    def snapshot(self):
+        """Returns the cumulative count of every bucket including +Inf and the sum."""
+        with self.lock:
+            counts, total = list(self.counts), self.sum
+        cumulative = []
+        count = 0
+        for bound, bucket_count in zip(self.buckets + ("+Inf",), counts):
+            count += bucket_count
+            cumulative.append((bound, count))
+        return cumulative, total
+
+
+class Metrics:
+    """Collects counters, gauges and histograms that can be rendered in the
+    Prometheus text format. Recording takes a dictionary lookup and a
+    lock so it can stay enabled all the time."""
+
+    def __init__(self):
+        self.descriptions = {}
+        self.histograms = {}
+        self.counters = {}
+        self.gauges = {}
+        self.lock = threading.Lock()
+
+    def describe(self, name, kind, description):
+        self.descriptions[name] = (kind, description)
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            with self.lock:
+                histogram = self.histograms.setdefault(key, Histogram())
+        histogram.observe(value)
+
+    def increment(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def set(self, name, value, **labels):
+        """Sets a value that can go up and down, such as the number of entries of a cache."""
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.gauges[key] = value
+
+    @contextmanager
+    def time(self, name, **labels):
+        """Observes the time spent in the with-block."""
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, perf_counter() - start, **labels)
+
+    def stage(self, stage):
+        """Observes the time spent in the with-block as the latency of a pipeline stage."""
+        return self.time("ocr_stage_seconds", stage=stage)
+
+    def render(self):
+        """Returns all metrics in the Prometheus text format."""
+        with self.lock:
+            histograms = sorted(self.histograms.items())
+            counters = sorted(self.counters.items())
+            gauges = sorted(self.gauges.items())
+
+        # The samples of every metric are collected first so that they are rendered together
+        families = {}
+
+        def _add(name, kind, *samples):
+            families.setdefault(name, (kind, []))[1].extend(samples)
+
+        for (name, labels), value in counters:
+            _add(name, "counter", "%s%s %s" % (name, _format_labels(labels), value))
+
+        for (name, labels), value in gauges:
+            _add(name, "gauge", "%s%s %s" % (name, _format_labels(labels), value))
+
+        for (name, labels), histogram in histograms:
+            cumulative, total = histogram.snapshot()
+            _add(name, "histogram", *(
+                "%s_bucket%s %d" % (name, _format_labels(labels + (("le", bound),)), count)
+                for bound, count in cumulative))
+            _add(name, "histogram",
+                 "%s_sum%s %r" % (name, _format_labels(labels), total),
+                 "%s_count%s %d" % (name, _format_labels(labels), cumulative[-1][1]))
+
+        lines = []
+        for name, (kind, samples) in sorted(families.items()):
+            kind, description = self.descriptions.get(name, (kind, None))
+            if description is not None:
+                lines.append("# HELP %s %s" % (name, description))
+            lines.append("# TYPE %s %s" % (name, kind))
+            lines.extend(samples)
+
+        return "\n".join(lines) + "\n"
+
+
+def _format_labels(labels):
+    if len(labels) == 0:
+        return ""
+    return "{%s}" % ",".join('%s="%s"' % (key, value) for key, value in labels)
+
+
+# Metrics of the process that all stages record into
+metrics = Metrics()
+metrics.describe("ocr_stage_seconds", "histogram", "Latency of the stages of the OCR and translation pipeline.")
+metrics.describe("ocr_images_total", "counter", "Number of processed images.")
+metrics.describe("ocr_request_seconds", "histogram", "Latency of batched server requests from queueing to their result.")
+metrics.describe("ocr_batches_total", "counter", "Number of batches run by the server.")
+metrics.describe("ocr_lines_total", "counter", "Number of recognized text lines.")
+metrics.describe("ocr_characters_total", "counter", "Number of recognized characters.")
+metrics.describe("cache_entries", "gauge", "Number of entries of a cache tier.")
+metrics.describe("cache_requests_total", "counter", "Number of cache lookups by result.")
@@ -1,8 +1,12 @@
-from time import time
+from concurrent.futures import ThreadPoolExecutor
 import cv2
 import numpy as np
 from .detection.cptn import CPTNDetector
+from .detection.tiling import TiledDetector
+from .detection.adaptive import AdaptiveScaleDetector
 from .recognition.crnn import CRNNRecognizer
+from .recognition.cache import RecognitionCache
+from .metrics import metrics
 
 
 def sort_box(box):
@@ -10,7 +14,9 @@ def sort_box(box):
     return box
 
 
-def dump_rotate_image(img, rot_deg, pt1, pt2, pt3, pt4):
+def rotation_matrix(img, rot_deg):
+    """Returns the matrix that rotates the image around its center onto a
+    canvas large enough for the whole rotated image and the canvas size."""
     rot_rad = np.radians(rot_deg)
     abs_cos_rot = np.fabs(np.cos(rot_rad))
     abs_sin_rot = np.fabs(np.sin(rot_rad))
@@ -21,45 +27,135 @@ def dump_rotate_image(img, rot_deg, pt1, pt2, pt3, pt4):
     rot_mat = cv2.getRotationMatrix2D((width // 2, height // 2), rot_deg, 1)
     rot_mat[0, 2] += (width_new - width) // 2
     rot_mat[1, 2] += (height_new - height) // 2
-    image_rotation = cv2.warpAffine(
-        img, rot_mat, (width_new, height_new), borderValue=(255, 255, 255))
+    return rot_mat, (width_new, height_new)
+
+
+def rotated_bounds(rot_mat, size, pt1, pt3):
+    """Returns the bounds (left, top, right, bottom) of a text line
+    with corners pt1 and pt3 on the rotated canvas of the given size."""
     pt1 = list(pt1)
     pt3 = list(pt3)
 
     [[pt1[0]], [pt1[1]]] = np.dot(rot_mat, np.array([[pt1[0]], [pt1[1]], [1]]))
     [[pt3[0]], [pt3[1]]] = np.dot(rot_mat, np.array([[pt3[0]], [pt3[1]], [1]]))
-    ydim, xdim = image_rotation.shape[:2]
+    xdim, ydim = size
+
+    return max(1, int(pt1[0])), max(1, int(pt1[1])), min(xdim - 1, int(pt3[0])), min(ydim - 1, int(pt3[1]))
+
+
+def dump_rotate_image(img, rot_deg, pt1, pt2, pt3, pt4):
+    rot_mat, size = rotation_matrix(img, rot_deg)
+    image_rotation = cv2.warpAffine(
+        img, rot_mat, size, borderValue=(255, 255, 255))
+    left, top, right, bottom = rotated_bounds(rot_mat, size, pt1, pt3)
+
+    return image_rotation[top:bottom, left:right]
+
+
+def rectify_line(img, rot_deg, pt1, pt2, pt3, pt4, max_slice_skew=1):
+    """Returns the same straightened text line as dump_rotate_image but
+    only warps the pixels of the line's strip instead of the whole image.
+    Lines whose ends differ by less than max_slice_skew pixels in height
+    are sliced from the image without warping."""
+    if abs(pt2[1] - pt1[1]) < max_slice_skew:
+        height, width = img.shape[:2]
+        return img[max(1, int(pt1[1])): min(height - 1, int(pt3[1])), max(1, int(pt1[0])): min(width - 1, int(pt3[0]))]
+
+    rot_mat, size = rotation_matrix(img, rot_deg)
+    left, top, right, bottom = rotated_bounds(rot_mat, size, pt1, pt3)
+    if right <= left or bottom <= top:
+        return img[:0, :0]
 
-    return image_rotation[
-        max(1, int(pt1[1])): min(ydim - 1, int(pt3[1])),
-        max(1, int(pt1[0])): min(xdim - 1, int(pt3[0]))
-    ]
+    # Move the strip to the origin so the destination is only as large as the strip
+    rot_mat[0, 2] -= left
+    rot_mat[1, 2] -= top
+    return cv2.warpAffine(img, rot_mat, (right - left, bottom - top), borderValue=(255, 255, 255))
 
 
 class OCR:
     """Uses a detector to detect regions of text
     which will then be recognized using a recognizer."""
 
-    def __init__(self, detector, recognizer):
+    # "roi" warps only the strip of every text line, "full" rotates the whole image per line
+    rectification = "roi"
+
+    def __init__(self, detector, recognizer, batch_recognition=True):
         self.detector = detector
         self.recognizer = recognizer
+        self.batch_recognition = batch_recognition
 
     def run(self, image):
-        # Detect bounding box
-        t = time()
-        text_recs, img_framed, image = self.detector.detect(image)
-        text_recs = sort_box(text_recs)
-        print("Detection:", time() - t)
+        return self.recognize(image, self.detect(image)), image
+
+    def detect(self, image):
+        """Returns the text lines detected in the image sorted from top to bottom."""
+        text_recs, _, _ = self.detector.detect(image)
+        return sort_box(text_recs)
+
+    def recognize(self, image, text_recs):
+        """Recognizes the text in the detected text lines of the image.
+        Returns the result of run."""
+        return self._char_rec(image, text_recs)
+
+    def run_batch(self, images):
+        """Runs OCR on multiple images. Images of the same shape are
+        detected together and the text lines of all images are recognized
+        together. Returns the result of run for every image."""
+        # Detect bounding boxes
+        shapes = {}
+        for index, image in enumerate(images):
+            shapes.setdefault(image.shape, []).append(index)
+        text_recs = [None] * len(images)
+        for indices in shapes.values():
+            texts = self.detector.detect_batch([images[index] for index in indices])
+            for index, text in zip(indices, texts):
+                text_recs[index] = sort_box(text)
+
+        # Recognize text in bounding boxes of all images
+        with metrics.stage("crop"):
+            crops = [self._crop_lines(image, recs) for image, recs in zip(images, text_recs)]
+        texts = self._recognize([part_img for part_imgs, _ in crops for part_img in part_imgs])
+
+        results = []
+        start = 0
+        for image, recs, (part_imgs, part_indices) in zip(images, text_recs, crops):
+            result = self._collect(recs, part_indices, texts[start:start + len(part_imgs)])
+            results.append((result, image))
+            start += len(part_imgs)
 
-        # Recognize text in bounding boxes
-        t = time()
-        result = self._char_rec(image, text_recs)
-        print("Recognition:", time() - t)
+        return results
 
-        return result, img_framed
+    def warmup(self, width=640, height=480):
+        """Runs the networks once on blank inputs so that the first
+        image does not pay for the lazy initialization of the runtime."""
+        self.detector.detect(np.full((height, width, 3), 255, np.uint8))
+        self.recognizer.recognize(np.full((32, 128, 3), 255, np.uint8))
 
     def _char_rec(self, img, text_recs, adjust=False):
+        with metrics.stage("crop"):
+            part_imgs, part_indices = self._crop_lines(img, text_recs, adjust)
+        texts = self._recognize(part_imgs)
+        return self._collect(text_recs, part_indices, texts)
+
+    def _recognize(self, part_imgs):
+        with metrics.stage("recognition"):
+            if self.batch_recognition:
+                return self.recognizer.recognize_batch(part_imgs)
+            return [self.recognizer.recognize(part_img) for part_img in part_imgs]
+
+    def _collect(self, text_recs, part_indices, texts):
         results = {}
+        for index, text in zip(part_indices, texts):
+            if len(text) > 0:
+                results[index] = [text_recs[index]]
+                results[index].append(text)  # 识别文字
+        return results
+
+    def _crop_lines(self, img, text_recs, adjust=False):
+        """Returns the straightened images of the text lines
+        and the indices of the text lines they belong to."""
+        part_imgs = []
+        part_indices = []
         x_dim, y_dim = img.shape[1], img.shape[0]
 
         for index, rec in enumerate(text_recs):
@@ -80,21 +176,42 @@ class OCR:
             degree = np.degrees(np.arctan2(
                 pt2[1] - pt1[1], pt2[0] - pt1[0]))  # 图像倾斜角度
 
-            part_img = dump_rotate_image(img, degree, pt1, pt2, pt3, pt4)
+            if self.rectification == "roi":
+                part_img = rectify_line(img, degree, pt1, pt2, pt3, pt4)
+            else:
+                part_img = dump_rotate_image(img, degree, pt1, pt2, pt3, pt4)
 
             if part_img.shape[0] < 1 or part_img.shape[1] < 1 or part_img.shape[0] > part_img.shape[1]:  # 过滤异常图片
                 continue
-            text = self.recognizer.recognize(part_img)
-            if len(text) > 0:
-                results[index] = [rec]
-                results[index].append(text)  # 识别文字
-
-        return results
-
-
-def make_default_ocr(detector_model_path, recognizer_model_path, alphabet_path, execution_providers):
-    return OCR(
-        detector=CPTNDetector(detector_model_path, execution_providers),
-        recognizer=CRNNRecognizer(
-            recognizer_model_path, alphabet_path, execution_providers)
-    )
+            part_imgs.append(part_img)
+            part_indices.append(index)
+
+        return part_imgs, part_indices
+
+
+def make_default_ocr(detector_model_path, recognizer_model_path, alphabet_path, execution_providers,
+                     tile_size=None, tile_overlap=128, tile_workers=1, recognition_cache_bytes=0,
+                     intra_op_threads=None, optimized_model_dir=None, warmup=False, io_binding=False,
+                     adaptive_text_height=None, min_detection_scale=0.25):
+    cache = RecognitionCache(recognition_cache_bytes) if recognition_cache_bytes > 0 else None
+
+    # Both sessions are created at the same time as loading and optimizing the graphs dominates startup
+    with ThreadPoolExecutor(2) as executor:
+        detector = executor.submit(
+            CPTNDetector, detector_model_path, execution_providers, intra_op_threads, optimized_model_dir,
+            io_binding)
+        recognizer = executor.submit(
+            CRNNRecognizer, recognizer_model_path, alphabet_path, execution_providers, cache, intra_op_threads,
+            optimized_model_dir, io_binding)
+        detector, recognizer = detector.result(), recognizer.result()
+
+    if tile_size is not None:
+        detector = TiledDetector(detector, tile_size, tile_overlap, tile_workers)
+
+    if adaptive_text_height is not None:
+        detector = AdaptiveScaleDetector(detector, adaptive_text_height, min_detection_scale)
+
+    ocr = OCR(detector=detector, recognizer=recognizer)
+    if warmup:
+        ocr.warmup()
+    return ocr
@@ -0,0 +1,113 @@
+import traceback
+from time import perf_counter
+from queue import Queue, Full, Empty
+from threading import Thread, Event
+
+# Put into the queues to let the stages finish
+_STOP = object()
+
+
+class Stage:
+    """A step of a pipeline that runs fn on its own thread. fn receives
+    the item of the previous stage and returns the item for the next stage
+    or None to not pass anything on. The source stage's fn takes no item."""
+
+    def __init__(self, name, fn, queue_size=1):
+        self.name = name
+        self.fn = fn
+        self.queue = Queue(queue_size)
+        self.busy = 0.0
+        self.items = 0
+        self.thread = None
+
+    def call(self, *args):
+        start = perf_counter()
+        try:
+            return self.fn(*args)
+        except Exception:
+            print("Stage %s failed:" % self.name)
+            traceback.print_exc()
+        finally:
+            self.busy += perf_counter() - start
+            self.items += 1
+
+
+class Pipeline:
+    """Runs a source stage and the stages after it concurrently, connected
+    by bounded queues. The source is called every interval seconds.
+    Items from the source replace the oldest waiting item when the queue
+    of the first stage is full so that stale frames are dropped, while
+    later stages block until the next stage has room so that every
+    accepted item reaches the end. This keeps the latency bounded and
+    lets the throughput approach the speed of the slowest stage."""
+
+    def __init__(self, source, stages, interval=0):
+        self.source = source
+        self.stages = stages
+        self.interval = interval
+        self.dropped = 0
+        self.stopping = Event()
+        self.started = None
+        self.stopped = None
+
+    def start(self):
+        self.started = perf_counter()
+        for index, stage in enumerate(self.stages):
+            next_stage = self.stages[index + 1] if index + 1 < len(self.stages) else None
+            stage.thread = Thread(target=self._run_stage, args=(stage, next_stage), daemon=True)
+            stage.thread.start()
+        self.source.thread = Thread(target=self._run_source, daemon=True)
+        self.source.thread.start()
+
+    def stop(self):
+        """Stops the source and waits until the stages processed all accepted items."""
+        self.stopping.set()
+        self.source.thread.join()
+        self.stages[0].queue.put(_STOP)
+        for stage in self.stages:
+            stage.thread.join()
+        self.stopped = perf_counter()
+
+    def _offer(self, item):
+        queue = self.stages[0].queue
+        while True:
+            try:
+                queue.put_nowait(item)
+                return
+            except Full:
+                try:
+                    queue.get_nowait()
+                    self.dropped += 1
+                except Empty:
+                    pass
+
+    def _run_source(self):
+        while not self.stopping.is_set():
+            start = perf_counter()
+            item = self.source.call()
+            if item is not None:
+                self._offer(item)
+            self.stopping.wait(max(0, self.interval - (perf_counter() - start)))
+
+    def _run_stage(self, stage, next_stage):
+        while True:
+            item = stage.queue.get()
+            if item is not _STOP:
+                item = stage.call(item)
+            if next_stage is not None and item is not None:
+                next_stage.queue.put(item)
+            if item is _STOP:
+                return
+
+    def stats(self):
+        """Returns the utilization (fraction of time busy) and the number
+        of items of every stage and the number of dropped items."""
+        elapsed = (self.stopped or perf_counter()) - self.started
+        return {
+            "stages": {
+                stage.name: {"utilization": stage.busy / elapsed, "items": stage.items}
+                for stage in [self.source] + self.stages
+            },
+            "dropped": self.dropped,
+            "throughput": self.stages[-1].items / elapsed,
+        }
@@ -0,0 +1,102 @@
+import os
+import glob
+import tempfile
+
+import click
+import cv2
+import numpy as np
+from onnxruntime.quantization import quantize_dynamic, quantize_static, CalibrationDataReader, QuantFormat, QuantType
+from onnxruntime.quantization.shape_inference import quant_pre_process
+
+from .ocr import make_default_ocr, sort_box
+from .detection.utils import resize
+from .variants import variant_path
+
+
+class FeedDataReader(CalibrationDataReader):
+    """Passes precomputed network inputs to the calibration."""
+
+    def __init__(self, feeds):
+        self.feeds = iter(feeds)
+
+    def get_next(self):
+        return next(self.feeds, None)
+
+
+def load_calibration_images(paths, max_height):
+    """Returns the RGB calibration images, downscaled like in the pipeline."""
+    images = []
+    for path in paths:
+        image = np.ascontiguousarray(cv2.imread(path)[:, :, ::-1])
+        if max_height is not None and image.shape[0] > max_height:
+            image = resize(image, height=max_height)
+        images.append(image)
+    return images
+
+
+def calibration_feeds(ocr, images, max_lines):
+    """Returns the inputs of the detector for the images and the inputs
+    of the recognizer for up to max_lines text lines detected in them."""
+    detector_feeds, recognizer_feeds = [], []
+    for image in images:
+        detector_feeds.append({"images": np.expand_dims(ocr.detector.preprocess(image), 0)})
+        text_recs = sort_box(ocr.detector.detect(image)[0])
+        part_imgs, _ = ocr._crop_lines(image, text_recs)
+        recognizer_feeds += [
+            {"images": np.expand_dims(ocr.recognizer.preprocess(part_img), 0)} for part_img in part_imgs
+        ]
+    return detector_feeds, recognizer_feeds[:max_lines]
+
+
+def quantize_model(model_path, variant, feeds=None):
+    """Writes the int8-dynamic or int8-static variant of the model next to it.
+    Static quantization calibrates the activation ranges on the feeds."""
+    output_path = variant_path(model_path, variant)
+    if variant not in ["int8-dynamic", "int8-static"]:
+        raise ValueError("Can not quantize to %s" % variant)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        # Shape inference and graph optimization make more operators quantizable
+        prepared_path = os.path.join(temp_dir, "prepared.onnx")
+        quant_pre_process(model_path, prepared_path, skip_symbolic_shape=True)
+
+        if variant == "int8-dynamic":
+            quantize_dynamic(prepared_path, output_path, weight_type=QuantType.QInt8)
+        else:
+            quantize_static(prepared_path, output_path, FeedDataReader(feeds), quant_format=QuantFormat.QDQ,
+                            activation_type=QuantType.QUInt8, weight_type=QuantType.QInt8)
+
+    return output_path
+
+
+@click.command()
+@click.option("--detector-model-path", type=click.Path(exists=True, dir_okay=False), default=os.path.join("data", "cptn.onnx"))
+@click.option("--recognizer-model-path", type=click.Path(exists=True, dir_okay=False), default=os.path.join("data", "crnn.onnx"))
+@click.option("--alphabet-path", type=click.Path(exists=True, dir_okay=False), default=os.path.join("data", "alphabet.pkl"))
+@click.option("--calibration-images", type=click.STRING, default=os.path.join("screenshots", "*.jpg"),
+              help="Glob of the images to calibrate the static quantization with.")
+@click.option("--max-height", type=click.INT, default=1000,
+              help="Calibration images are downscaled to this height like in the pipeline.")
+@click.option("--max-lines", type=click.INT, default=500,
+              help="Maximum number of text lines to calibrate the recognizer with.")
+@click.option("--variants", multiple=True, type=click.Choice(["int8-dynamic", "int8-static"]),
+              default=["int8-dynamic", "int8-static"])
+def main(detector_model_path, recognizer_model_path, alphabet_path, calibration_images, max_height, max_lines,
+         variants):
+    """Writes int8 quantized variants of the detector and recognizer networks."""
+    feeds = [None, None]
+    if "int8-static" in variants:
+        paths = sorted(glob.glob(calibration_images))
+        if len(paths) == 0:
+            raise click.BadParameter("No calibration images found at %s" % calibration_images)
+        ocr = make_default_ocr(detector_model_path, recognizer_model_path, alphabet_path, ["CPUExecutionProvider"])
+        feeds = calibration_feeds(ocr, load_calibration_images(paths, max_height), max_lines)
+        print("Calibrating with %d images and %d text lines" % (len(feeds[0]), len(feeds[1])))
+
+    for variant in variants:
+        for model_path, model_feeds in zip([detector_model_path, recognizer_model_path], feeds):
+            print("Wrote", quantize_model(model_path, variant, model_feeds))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+import sys
+import hashlib
+from threading import Lock
+from collections import OrderedDict
+from ..metrics import metrics
+
+# Estimated bytes of bookkeeping per entry besides the key and value
+ENTRY_OVERHEAD = 200
+
+
+class RecognitionCache:
+    """Bounded least-recently-used cache of recognition results keyed by a
+    hash of the normalized text-line tensor. Evicts the least recently used
+    entries once the estimated memory of all entries exceeds max_bytes.
+    Safe to use from multiple threads."""
+
+    def __init__(self, max_bytes=16 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = Lock()
+
+    @staticmethod
+    def key(tensor, return_probs=False):
+        """Returns the cache key of a normalized text-line tensor."""
+        digest = hashlib.blake2b(tensor.tobytes(), digest_size=16).digest()
+        return tensor.shape, digest, return_probs
+
+    @staticmethod
+    def entry_size(value):
+        if isinstance(value, tuple):
+            text, probs = value
+            return ENTRY_OVERHEAD + sys.getsizeof(text) + probs.nbytes
+        return ENTRY_OVERHEAD + sys.getsizeof(value)
+
+    def get(self, key):
+        """Returns the cached value for the key or None."""
+        with self.lock:
+            value = self.entries.get(key)
+            if value is None:
+                self.misses += 1
+                metrics.increment("cache_requests_total", cache="recognition", result="misses")
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            metrics.increment("cache_requests_total", cache="recognition", result="hits")
+            return value
+
+    def put(self, key, value):
+        size = self.entry_size(value)
+        if size > self.max_bytes:
+            return
+
+        with self.lock:
+            if key in self.entries:
+                self.bytes -= self.entry_size(self.entries.pop(key))
+            self.entries[key] = value
+            self.bytes += size
+
+            while self.bytes > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.bytes -= self.entry_size(evicted)
+            metrics.set("cache_entries", len(self.entries), cache="recognition", tier="memory")
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.bytes = 0
+            metrics.set("cache_entries", 0, cache="recognition", tier="memory")
+
+    def stats(self):
+        """Returns the number of entries, their estimated bytes and the hit and miss counts."""
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "bytes": self.bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups > 0 else 0.0
+            }
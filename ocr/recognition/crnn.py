@@ -4,7 +4,7 @@ import pickle as pkl
 from PIL import Image
 import cv2
 import numpy as np
-import onnxruntime as rt
+from ..session import create_session, SessionRunner
 
 
 def get_alphabet(path):
@@ -44,12 +44,21 @@ def resize_normalize(img, size, interpolation=Image.LANCZOS, is_test=True):
     return img
 
 
+def strip_with_probs(text, probs):
+    """Strips whitespace from a text together with
+    the probabilities of the stripped characters."""
+    start = len(text) - len(text.lstrip())
+    end = len(text.rstrip())
+    return text[start:end], probs[start:end]
+
+
 class StringLabelConverter(object):
     def __init__(self, alphabet, ignore_case=False):
         self._ignore_case = ignore_case
         if self._ignore_case:
             alphabet = alphabet.lower()
         self.alphabet = alphabet + '_'  # for `-1` index
+        self.characters = np.array(list(self.alphabet))
 
         self.dict = {}
         for i, char in enumerate(alphabet):
@@ -57,46 +66,163 @@ class StringLabelConverter(object):
             self.dict[char] = i + 1
 
     def decode(self, t, length, raw=False):
+        t = np.asarray(t)
         if raw:
-            return ''.join([self.alphabet[i - 1] for i in t])
+            return ''.join(self.characters[t - 1])
         else:
-            char_list = []
-            for i in range(length):
-                if t[i] != 0 and (not (i > 0 and t[i - 1] == t[i])):
-                    char_list.append(self.alphabet[t[i] - 1])
-            return ''.join(char_list)
+            return self.decode_batch(t[:, np.newaxis], [length])[0]
+
+    def decode_batch(self, t, lengths, probs=None):
+        """Greedy decodes a batch of label sequences of shape (T, B) where
+        only the first lengths[b] labels of sequence b are used. Repeated
+        labels are collapsed and blanks are dropped. Returns the texts and,
+        if the probabilities of the labels of shape (T, B) are given,
+        the probability of every decoded character."""
+        t = np.asarray(t).T
+        keep = t != 0
+        keep[:, 1:] &= t[:, 1:] != t[:, :-1]
+        keep &= np.arange(t.shape[1]) < np.asarray(lengths)[:, np.newaxis]
+
+        splits = np.cumsum(keep.sum(axis=1))[:-1]
+        texts = [''.join(chars) for chars in np.split(
+            self.characters[t[keep] - 1], splits)]
+
+        if probs is None:
+            return texts
+        return texts, np.split(np.asarray(probs).T[keep], splits)
 
 
 class CRNNRecognizer:
     """Recognize characters within areas of potential text."""
 
-    def __init__(self, model_path, alphabet_path, execution_providers):
+    bucket_step = 64
+    max_batch_size = 32
+
+    def __init__(self, model_path, alphabet_path, execution_providers, cache=None, intra_op_threads=None,
+                 optimized_model_dir=None, io_binding=False):
         alphabet_unicode = get_alphabet(alphabet_path)
         self.alphabet = ''.join([chr(uni) for uni in alphabet_unicode])
         self.nclass = len(self.alphabet) + 1
-        session_opts = rt.SessionOptions()
-        session_opts.graph_optimization_level = rt.GraphOptimizationLevel.ORT_ENABLE_ALL
-        session_opts.enable_mem_pattern = False
-        self.session = rt.InferenceSession(model_path, session_opts)
-        self.session.set_providers(execution_providers)
+        self.session = create_session(model_path, execution_providers, intra_op_threads, optimized_model_dir)
+        self.runner = SessionRunner(self.session, io_binding)
         self.converter = StringLabelConverter(self.alphabet)
+        self.cache = cache
+
+        # Models exported with a fixed batch size can only run one image at a time
+        batch_dim = self.session.get_inputs()[0].shape[0]
+        if isinstance(batch_dim, int):
+            self.max_batch_size = batch_dim
 
-    def recognize(self, img):
+    @staticmethod
+    def line_width(img):
+        """Returns the width W of the tensor of a text line."""
         h, w = img.shape[:2]
+        return int(w / h * 32)
+
+    def preprocess(self, img, out=None):
+        """Converts an image of a text line to a normalized grayscale
+        tensor of shape (1, 32, W), written into out if given."""
+        width = self.line_width(img)
         if len(img.shape) == 3:
             img = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-        image = Image.fromarray(img)
-        image = resize_normalize(image, (int(w / h * 32), 32))
-        image = np.expand_dims(image, 0)
-
-        preds = self.session.run(None, {"images": image})
-
-        preds = np.array(preds, np.float32)
-        preds = np.argmax(preds, axis=-1)
-        preds = preds.transpose(1, 0, 2).reshape(-1)
-
-        preds_size = preds.shape[0]
-
-        txt = self.converter.decode(preds, preds_size, raw=False).strip()
+        resized = np.asarray(Image.fromarray(img).resize((width, 32), Image.LANCZOS))
+        if out is None:
+            out = np.empty((1, 32, width), np.float32)
+        # Same steps as resize_normalize, in place
+        np.divide(resized, np.float32(255), out=out[0])
+        out -= 0.5
+        out /= 0.5
+        return out
+
+    def _preprocess_lines(self, imgs):
+        """Preprocesses the images of text lines next to each other into one tensor."""
+        widths = [self.line_width(img) for img in imgs]
+        lines = self.runner.scratch((32 * sum(widths),))
+        images = []
+        offset = 0
+        for img, width in zip(imgs, widths):
+            images.append(self.preprocess(img, out=lines[offset:offset + 32 * width].reshape(1, 32, width)))
+            offset += 32 * width
+        return images
+
+    def decode(self, preds, lengths, return_probs=False):
+        """Decodes network outputs of shape (T, B, nclass) where only the
+        first lengths[b] time steps of batch entry b are used. If return_probs
+        is set, (text, probs) tuples with the probability of every
+        character are returned instead of texts."""
+        labels = np.argmax(preds, axis=-1)
+        if not return_probs:
+            return [txt.strip() for txt in self.converter.decode_batch(labels, lengths)]
+
+        # Softmax probability of the most likely class
+        max_preds = np.take_along_axis(preds, labels[..., np.newaxis], axis=-1)
+        probs = 1 / np.sum(np.exp(preds - max_preds), axis=-1)
+        texts, char_probs = self.converter.decode_batch(labels, lengths, probs)
+        return [strip_with_probs(txt, p) for txt, p in zip(texts, char_probs)]
+
+    def recognize(self, img, return_probs=False):
+        batch = self.runner.input((1, 1, 32, self.line_width(img)))
+        image = self.preprocess(img, out=batch[0])
+
+        if self.cache is not None:
+            key = self.cache.key(image, return_probs)
+            txt = self.cache.get(key)
+            if txt is not None:
+                return txt
+
+        # Predictions have shape (T, 1, nclass)
+        preds = self.runner.run(batch)[0]
+        txt = self.decode(preds, [preds.shape[0]], return_probs)[0]
+
+        if self.cache is not None:
+            self.cache.put(key, txt)
 
         return txt
+
+    def recognize_batch(self, imgs, return_probs=False):
+        """Recognizes the text of multiple images of text lines.
+        The images are grouped into buckets of similar width and
+        zero-padded to the bucket width so that each bucket only
+        requires a single inference. Returns the texts in the
+        same order as the images. Cached images are not
+        recognized again."""
+        images = self._preprocess_lines(imgs)
+
+        texts = [None] * len(images)
+        keys = [None] * len(images)
+        if self.cache is not None:
+            for index, image in enumerate(images):
+                keys[index] = self.cache.key(image, return_probs)
+                texts[index] = self.cache.get(keys[index])
+
+        buckets = {}
+        for index, image in enumerate(images):
+            if texts[index] is not None:
+                continue
+            bucket_width = int(np.ceil(
+                image.shape[2] / self.bucket_step)) * self.bucket_step
+            buckets.setdefault(bucket_width, []).append(index)
+
+        for bucket_width, indices in buckets.items():
+            for start in range(0, len(indices), self.max_batch_size):
+                batch_indices = indices[start:start + self.max_batch_size]
+                batch = self.runner.input((len(batch_indices), 1, 32, bucket_width))
+                for batch_index, index in enumerate(batch_indices):
+                    width = images[index].shape[2]
+                    batch[batch_index, :, :, :width] = images[index]
+                    batch[batch_index, :, :, width:] = 0
+
+                # Predictions have shape (T, B, nclass)
+                preds = self.runner.run(batch)[0]
+
+                # Only decode the time steps that belong to the unpadded image
+                steps = preds.shape[0]
+                lengths = [min(steps, int(np.ceil(steps * images[index].shape[2] / bucket_width)))
+                           for index in batch_indices]
+                batch_texts = self.decode(preds, lengths, return_probs)
+                for index, txt in zip(batch_indices, batch_texts):
+                    texts[index] = txt
+                    if self.cache is not None:
+                        self.cache.put(keys[index], txt)
+
+        return texts
@@ -0,0 +1,56 @@
+import numpy as np
+
+
+def clip_regions(regions, image_shape):
+    """Clips regions (left, top, right, bottom) to the image bounds
+    and removes the ones that are empty afterwards."""
+    h, w = image_shape[:2]
+    clipped = []
+    for left, top, right, bottom in regions:
+        left, top = max(0, int(left)), max(0, int(top))
+        right, bottom = min(w, int(right)), min(h, int(bottom))
+        if right > left and bottom > top:
+            clipped.append((left, top, right, bottom))
+    return clipped
+
+
+def run_regions(ocr, image, regions):
+    """Runs OCR on the crops of the given regions (left, top, right, bottom)
+    of an image and returns the text lines as (rec, text) in image coordinates."""
+    results = []
+    for left, top, right, bottom in regions:
+        result, _ = ocr.run(image[top:bottom, left:right])
+        results += offset_results(result, left, top)
+    return results
+
+
+def offset_results(result, left, top):
+    """Moves the text lines of the result of OCR.run on a crop whose
+    top-left corner is at (left, top) to image coordinates."""
+    results = []
+    for rec, text in result.values():
+        rec = np.array(rec, np.float64)
+        rec[0:8:2] += left
+        rec[1:8:2] += top
+        results.append((rec, text))
+    return results
+
+
+def sort_results(results):
+    """Sorts text lines (rec, text) from top to bottom
+    and returns them in the format of OCR.run."""
+    results = sorted(results, key=lambda result: sum([result[0][1], result[0][3], result[0][5], result[0][7]]))
+    return {index: [rec, text] for index, (rec, text) in enumerate(results)}
+
+
+class RegionOCR:
+    """Runs OCR only on regions of interest (left, top, right, bottom)
+    of an image. Only the crops of the regions are detected."""
+
+    def __init__(self, ocr, regions):
+        self.ocr = ocr
+        self.regions = regions
+
+    def run(self, image):
+        regions = clip_regions(self.regions, image.shape)
+        return sort_results(run_regions(self.ocr, image, regions)), image
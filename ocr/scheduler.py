@@ -0,0 +1,58 @@
+from time import perf_counter
+from queue import Queue, Empty
+from threading import Thread
+from concurrent.futures import Future
+from .metrics import metrics
+
+
+class BatchScheduler:
+    """Collects OCR requests from multiple threads and runs them together
+    using OCR.run_batch on a single worker thread. A batch is started once
+    max_batch_size requests arrived or max_wait seconds passed since the
+    first request of the batch. The latency of every request from being
+    queued until its result is available is recorded in the metrics."""
+
+    def __init__(self, ocr, max_batch_size=8, max_wait=0.01):
+        self.ocr = ocr
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.queue = Queue()
+        self.thread = Thread(target=self._loop, daemon=True)
+        self.thread.start()
+
+    def run(self, image):
+        """Runs OCR on an image within the next batch and
+        blocks until its result is available."""
+        future = Future()
+        self.queue.put((image, future, perf_counter()))
+        return future.result()
+
+    def _next_batch(self):
+        requests = [self.queue.get()]
+        deadline = perf_counter() + self.max_wait
+        while len(requests) < self.max_batch_size:
+            remaining = deadline - perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                requests.append(self.queue.get(timeout=remaining))
+            except Empty:
+                break
+        return requests
+
+    def _loop(self):
+        while True:
+            requests = self._next_batch()
+
+            try:
+                results = self.ocr.run_batch([image for image, _, _ in requests])
+            except Exception as e:
+                for _, future, _ in requests:
+                    future.set_exception(e)
+                continue
+
+            now = perf_counter()
+            metrics.increment("ocr_batches_total")
+            for (_, future, start), result in zip(requests, results):
+                metrics.observe("ocr_request_seconds", now - start)
+                future.set_result(result)
@@ -0,0 +1,148 @@
+import os
+import hashlib
+import platform
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import onnxruntime as rt
+
+# Level up to which optimized graphs are saved. The layout optimizations of
+# ORT_ENABLE_ALL depend on the instruction set of the CPU, so graphs optimized
+# with them must not be loaded on other machines.
+SAVED_OPTIMIZATION_LEVEL = rt.GraphOptimizationLevel.ORT_ENABLE_EXTENDED
+
+
+def optimized_model_key(model_path, execution_providers):
+    """Returns a key that identifies the optimized graph of a model. The
+    optimized graph can contain operators specific to the execution
+    providers so the key depends on them and the runtime as well."""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(model_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    digest.update(repr((
+        list(execution_providers), rt.get_available_providers(), rt.__version__, platform.machine(),
+        SAVED_OPTIMIZATION_LEVEL
+    )).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def create_session(model_path, execution_providers, intra_op_threads=None, optimized_model_dir=None):
+    """Creates an inference session for the model at the path.
+    If optimized_model_dir is given, the graph optimized up to the
+    extended level is saved there on the first run. Afterwards only
+    the cheap layout optimizations are applied when loading it."""
+    session_opts = rt.SessionOptions()
+    session_opts.graph_optimization_level = rt.GraphOptimizationLevel.ORT_ENABLE_ALL
+    session_opts.enable_mem_pattern = False
+    if intra_op_threads is not None:
+        session_opts.intra_op_num_threads = intra_op_threads
+
+    if optimized_model_dir is not None:
+        name = os.path.splitext(os.path.basename(model_path))[0]
+        optimized_path = os.path.join(
+            optimized_model_dir, "%s-%s.onnx" % (name, optimized_model_key(model_path, execution_providers)))
+
+        if not os.path.exists(optimized_path):
+            # Written to a temporary file first so concurrent processes never load a partial model
+            os.makedirs(optimized_model_dir, exist_ok=True)
+            temp_path = "%s.%d.tmp" % (optimized_path, os.getpid())
+            save_opts = rt.SessionOptions()
+            save_opts.graph_optimization_level = SAVED_OPTIMIZATION_LEVEL
+            save_opts.optimized_model_filepath = temp_path
+            rt.InferenceSession(model_path, save_opts)
+            os.replace(temp_path, optimized_path)
+        model_path = optimized_path
+
+    session = rt.InferenceSession(model_path, session_opts)
+    session.set_providers(execution_providers)
+    return session
+
+
+class GrowableBuffer:
+    """A float32 buffer that hands out views of any shape and is
+    only reallocated when a larger shape arrives."""
+
+    def __init__(self):
+        self.data = np.empty(0, np.float32)
+
+    def view(self, shape):
+        size = int(np.prod(shape))
+        if size > self.data.size:
+            self.data = np.empty(size, np.float32)
+        return self.data[:size].reshape(shape)
+
+
+class SessionRunner:
+    """Runs a session with a single float input. With io_binding, the
+    inputs and outputs are bound to buffers that are reused across runs
+    so that steady-state inference does not allocate any tensors. The
+    buffers belong to the calling thread and the returned outputs are
+    only valid until the thread's next run."""
+
+    # Number of input shapes per thread whose output shapes are remembered
+    max_output_shapes = 64
+
+    def __init__(self, session, io_binding=False):
+        self.session = session
+        self.io_binding = io_binding
+        self.input_name = session.get_inputs()[0].name
+        self.output_names = [output.name for output in session.get_outputs()]
+        self.local = threading.local()
+
+    def _buffers(self):
+        local = self.local
+        if not hasattr(local, "binding"):
+            local.binding = self.session.io_binding()
+            local.input = GrowableBuffer()
+            local.scratch = GrowableBuffer()
+            local.outputs = [GrowableBuffer() for _ in self.output_names]
+            # Output shapes are only known after running an input shape once. The least
+            # recently used shapes are forgotten as images of arbitrary sizes arrive.
+            local.output_shapes = OrderedDict()
+        return local
+
+    def input(self, shape):
+        """Returns a tensor of the shape for the preprocessing to write into."""
+        if not self.io_binding:
+            return np.empty(shape, np.float32)
+        return self._buffers().input.view(shape)
+
+    def scratch(self, shape):
+        """Returns a tensor of the shape for staging data before it is
+        copied into the input, reused across runs with io_binding."""
+        if not self.io_binding:
+            return np.empty(shape, np.float32)
+        return self._buffers().scratch.view(shape)
+
+    def run(self, tensor):
+        """Runs the session on the tensor and returns all outputs."""
+        if not self.io_binding:
+            return self.session.run(None, {self.input_name: tensor})
+
+        local = self._buffers()
+        binding = local.binding
+        tensor = np.ascontiguousarray(tensor, np.float32)
+        binding.bind_input(self.input_name, "cpu", 0, np.float32, tensor.shape, tensor.ctypes.data)
+
+        output_shapes = local.output_shapes.get(tensor.shape)
+        if output_shapes is None:
+            for name in self.output_names:
+                binding.bind_output(name, "cpu")
+            self.session.run_with_iobinding(binding)
+            outputs = binding.copy_outputs_to_cpu()
+            local.output_shapes[tensor.shape] = [output.shape for output in outputs]
+            if len(local.output_shapes) > self.max_output_shapes:
+                local.output_shapes.popitem(last=False)
+            # Grown now so that later runs of the shape write into the buffers directly
+            for buffer, output in zip(local.outputs, outputs):
+                buffer.view(output.shape)[...] = output
+            return [buffer.view(output.shape) for buffer, output in zip(local.outputs, outputs)]
+
+        local.output_shapes.move_to_end(tensor.shape)
+        outputs = [buffer.view(shape) for buffer, shape in zip(local.outputs, output_shapes)]
+        for name, output in zip(self.output_names, outputs):
+            binding.bind_output(name, "cpu", 0, np.float32, output.shape, output.ctypes.data)
+        self.session.run_with_iobinding(binding)
+        return outputs
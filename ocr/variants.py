@@ -0,0 +1,15 @@
+import os
+
+# Precisions a network can be run in. Quantized variants are created with `python -m ocr.quantize`.
+MODEL_VARIANTS = ("fp32", "int8-dynamic", "int8-static")
+
+
+def variant_path(model_path, variant):
+    """Returns the path of a variant of the model, e.g. data/cptn.int8-static.onnx
+    for data/cptn.onnx. The path of the fp32 variant is the model path itself."""
+    if variant not in MODEL_VARIANTS:
+        raise ValueError("Unknown model variant %s, expected one of %s" % (variant, ", ".join(MODEL_VARIANTS)))
+    if variant == "fp32":
+        return model_path
+    root, ext = os.path.splitext(model_path)
+    return "%s.%s%s" % (root, variant, ext)
@@ -0,0 +1,153 @@
+from time import perf_counter
+from queue import Queue
+import multiprocessing
+from multiprocessing.shared_memory import SharedMemory
+import numpy as np
+
+
+def _worker_main(make_ocr, connection):
+    """Entry point of worker processes. Receives the shared memory name,
+    shape and dtype of images and replies with the OCR results."""
+    ocr = make_ocr()
+    connection.send("ready")
+
+    shared_memory = None
+    while True:
+        task = connection.recv()
+        if task is None:
+            break
+
+        name, shape, dtype = task
+        if shared_memory is None or shared_memory.name != name:
+            if shared_memory is not None:
+                shared_memory.close()
+            shared_memory = SharedMemory(name)
+
+        image = np.ndarray(shape, dtype, buffer=shared_memory.buf)
+        try:
+            result, _ = ocr.run(image)
+            connection.send((True, result))
+        except Exception as e:
+            connection.send((False, repr(e)))
+        del image
+
+    if shared_memory is not None:
+        shared_memory.close()
+
+
+class OCRWorker:
+    """Process that owns its own OCR sessions. Images are written to
+    shared memory owned by this object instead of being pickled."""
+
+    def __init__(self, context, make_ocr, ready_timeout):
+        self.context = context
+        self.make_ocr = make_ocr
+        self.ready_timeout = ready_timeout
+        self.shared_memory = None
+        self.tasks = 0
+        self.failures = 0
+        self.restarts = 0
+        self.start()
+
+    def start(self):
+        self.connection, child_connection = self.context.Pipe()
+        self.process = self.context.Process(
+            target=_worker_main, args=(self.make_ocr, child_connection), daemon=True)
+        self.process.start()
+        child_connection.close()
+
+    def wait_ready(self):
+        if not self.connection.poll(self.ready_timeout) or self.connection.recv() != "ready":
+            raise RuntimeError("OCR worker %d did not start" % self.process.pid)
+
+    def restart(self):
+        self.process.kill()
+        self.process.join()
+        self.restarts += 1
+        self.start()
+        self.wait_ready()
+
+    def run(self, image, timeout):
+        """Runs OCR on the image in the worker process. Restarts the
+        worker if it dies or does not reply within the timeout."""
+        image = np.ascontiguousarray(image)
+        if self.shared_memory is None or self.shared_memory.size < image.nbytes:
+            self.close_shared_memory()
+            self.shared_memory = SharedMemory(create=True, size=max(1, image.nbytes))
+        np.ndarray(image.shape, image.dtype, buffer=self.shared_memory.buf)[...] = image
+
+        try:
+            self.connection.send((self.shared_memory.name, image.shape, image.dtype.str))
+
+            start = perf_counter()
+            while not self.connection.poll(0.1):
+                if not self.process.is_alive() or perf_counter() - start > timeout:
+                    raise TimeoutError()
+
+            success, result = self.connection.recv()
+        except (OSError, EOFError):
+            self.failures += 1
+            self.restart()
+            raise RuntimeError("OCR worker died or timed out")
+
+        if not success:
+            self.failures += 1
+            raise RuntimeError("OCR worker failed: %s" % result)
+
+        self.tasks += 1
+        return result
+
+    def health(self):
+        return {
+            "pid": self.process.pid,
+            "alive": self.process.is_alive(),
+            "tasks": self.tasks,
+            "failures": self.failures,
+            "restarts": self.restarts
+        }
+
+    def close_shared_memory(self):
+        if self.shared_memory is not None:
+            self.shared_memory.close()
+            self.shared_memory.unlink()
+            self.shared_memory = None
+
+    def close(self):
+        if self.process.is_alive():
+            self.connection.send(None)
+            self.process.join(5)
+        if self.process.is_alive():
+            self.process.kill()
+        self.close_shared_memory()
+
+
+class WorkerPool:
+    """Runs OCR in multiple worker processes so that the post-processing
+    of different images does not compete for the GIL. Every worker creates
+    its own OCR using make_ocr, which has to be picklable. Can be used
+    from multiple threads and in place of an OCR."""
+
+    def __init__(self, make_ocr, workers, timeout=60, ready_timeout=120):
+        context = multiprocessing.get_context("spawn")
+        self.timeout = timeout
+        self.workers = [OCRWorker(context, make_ocr, ready_timeout) for _ in range(workers)]
+        self.idle = Queue()
+        for worker in self.workers:
+            worker.wait_ready()
+            self.idle.put(worker)
+
+    def run(self, image):
+        """Runs OCR on the image in the next idle worker."""
+        worker = self.idle.get()
+        try:
+            return worker.run(image, self.timeout), image
+        finally:
+            self.idle.put(worker)
+
+    def health(self):
+        """Returns the state of every worker."""
+        return [worker.health() for worker in self.workers]
+
+    def close(self):
+        for worker in self.workers:
+            worker.close()
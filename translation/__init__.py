@@ -1 +1,4 @@
-from .util import get_pinyin, get_all_phrase_translations, get_translate_fn, contains_chinese
+from .util import get_pinyin, get_all_phrase_translations, get_sentence_translation, get_translate_fn, contains_chinese, \
+    use_cedict_index
+from .translator import TranslatorBackend, GoogleTranslatorBackend, LocalTranslatorBackend, BatchTranslator
+from .cache import TranslationCache
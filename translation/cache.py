@@ -0,0 +1,143 @@
+import sqlite3
+import time
+from threading import Lock
+from collections import OrderedDict
+from ocr.metrics import metrics
+
+
+class TranslationCache:
+    """Caches the pinyin and phrase translation text of sentences.
+    Recently used sentences are kept in a bounded in-memory LRU tier.
+    If a path is given, all sentences are also stored in an SQLite
+    database that survives restarts and evicts the least recently
+    used entries once it holds more than max_disk_entries. The times
+    disk entries were last used are written in batches."""
+
+    # Number of disk hits whose last use is written in one transaction
+    touch_batch_size = 64
+
+    def __init__(self, max_entries=4096, path=None, max_disk_entries=100000):
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self.entries = OrderedDict()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.lock = Lock()
+
+        self.db = None
+        self.disk_entries = 0
+        self.touched = {}
+        if path is not None:
+            self.db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS translations ("
+                "text TEXT PRIMARY KEY, pinyin_text TEXT, translation_text TEXT, last_used REAL)")
+            self.db.execute(
+                "CREATE INDEX IF NOT EXISTS translations_last_used ON translations (last_used)")
+            self.disk_entries = self.db.execute("SELECT COUNT(*) FROM translations").fetchone()[0]
+            metrics.set("cache_entries", self.disk_entries, cache="translation", tier="disk")
+
+    def _put_memory(self, text, value):
+        self.entries[text] = value
+        self.entries.move_to_end(text)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        metrics.set("cache_entries", len(self.entries), cache="translation", tier="memory")
+
+    def get(self, text):
+        """Returns the cached (pinyin_text, translation_text) of the text or None."""
+        with self.lock:
+            value = self.entries.get(text)
+            if value is not None:
+                self.entries.move_to_end(text)
+                self.memory_hits += 1
+                metrics.increment("cache_requests_total", cache="translation", result="hits", tier="memory")
+                return value
+
+            if self.db is not None:
+                row = self.db.execute(
+                    "SELECT pinyin_text, translation_text FROM translations WHERE text = ?", (text,)).fetchone()
+                if row is not None:
+                    self.touched[text] = time.time()
+                    if len(self.touched) >= self.touch_batch_size:
+                        self._write(self._flush_touched)
+                    value = tuple(row)
+                    self._put_memory(text, value)
+                    self.disk_hits += 1
+                    metrics.increment("cache_requests_total", cache="translation", result="hits", tier="disk")
+                    return value
+
+            self.misses += 1
+            metrics.increment("cache_requests_total", cache="translation", result="misses")
+            return None
+
+    def put(self, text, value):
+        with self.lock:
+            self._put_memory(text, value)
+
+            if self.db is not None:
+                self._write(lambda: self._insert(text, value))
+
+    def _write(self, fn):
+        """Calls fn within a single transaction."""
+        self.db.execute("BEGIN")
+        try:
+            fn()
+        except BaseException:
+            self.db.execute("ROLLBACK")
+            raise
+        self.db.execute("COMMIT")
+
+    def _flush_touched(self):
+        self.db.executemany(
+            "UPDATE translations SET last_used = ? WHERE text = ?",
+            [(last_used, text) for text, last_used in self.touched.items()])
+        self.touched.clear()
+
+    def _insert(self, text, value):
+        # Pending last uses are written first so that recently used entries are not evicted
+        self._flush_touched()
+        now = time.time()
+        if self.db.execute(
+                "INSERT OR IGNORE INTO translations VALUES (?, ?, ?, ?)", (text, *value, now)).rowcount > 0:
+            self.disk_entries += 1
+        else:
+            self.db.execute(
+                "UPDATE translations SET pinyin_text = ?, translation_text = ?, last_used = ? WHERE text = ?",
+                (*value, now, text))
+
+        if self.disk_entries > self.max_disk_entries:
+            self.db.execute(
+                "DELETE FROM translations WHERE text IN (SELECT text FROM translations "
+                "ORDER BY last_used LIMIT ?)", (self.disk_entries - self.max_disk_entries,))
+            self.disk_entries = self.max_disk_entries
+        metrics.set("cache_entries", self.disk_entries, cache="translation", tier="disk")
+
+    def get_or_compute(self, text, compute):
+        """Returns the cached value of the text or computes
+        it using compute(text) and caches it."""
+        value = self.get(text)
+        if value is None:
+            value = tuple(compute(text))
+            self.put(text, value)
+        return value
+
+    def stats(self):
+        """Returns the number of entries of each tier and the hit and miss counts."""
+        with self.lock:
+            return {
+                "memory_entries": len(self.entries),
+                "disk_entries": self.disk_entries,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses
+            }
+
+    def close(self):
+        if self.db is not None:
+            with self.lock:
+                if len(self.touched) > 0:
+                    self._write(self._flush_touched)
+            self.db.close()
+            self.db = None
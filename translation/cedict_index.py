@@ -0,0 +1,190 @@
+import os
+import mmap
+import struct
+import unicodedata
+from array import array
+from bisect import bisect_left
+from itertools import accumulate
+
+import click
+
+MAGIC = b"CEDICT01"
+
+# Header of the magic followed by the counts and the byte offsets of all sections
+HEADER = struct.Struct("<8s3Q9Q")
+
+
+def _offsets(blobs):
+    return array("I", accumulate([0] + [len(blob) for blob in blobs]))
+
+
+def _char_pinyin(char):
+    """Returns the pinyin of a character with tone marks. The pinyin package
+    fails for syllables without vowels such as n, which are kept unmarked."""
+    import pinyin
+    try:
+        return pinyin.get(char)
+    except RuntimeError:
+        return pinyin.get(char, format="strip")
+
+
+def build_index(path):
+    """Compiles the CEDICT dictionary and the pinyin table of the pinyin
+    package into a compact binary index at path that can be memory-mapped."""
+    import pinyin
+    import pinyin.cedict
+    from pinyin.pinyin import pinyin_dict
+
+    # Later dictionary entries replace earlier ones like in pinyin.cedict
+    pinyin.cedict.init()
+    words = sorted(
+        (word.encode("utf-8"), "/".join(meanings).encode("utf-8"))
+        for word, meanings in pinyin.cedict.dictionaries["simplified"].items()
+    )
+
+    # Range of the words starting with each character
+    first_codes = []
+    first_starts = []
+    for index, (word, _) in enumerate(words):
+        code = ord(word.decode("utf-8")[0])
+        if len(first_codes) == 0 or first_codes[-1] != code:
+            first_codes.append(code)
+            first_starts.append(index)
+    first_starts.append(len(words))
+
+    codes = sorted(int(key, 16) for key in pinyin_dict)
+    pinyins = [_char_pinyin(chr(code)).encode("utf-8") for code in codes]
+
+    sections = [
+        _offsets([word for word, _ in words]).tobytes(),
+        _offsets([meaning for _, meaning in words]).tobytes(),
+        array("I", codes).tobytes(),
+        _offsets(pinyins).tobytes(),
+        b"".join(word for word, _ in words),
+        b"".join(meaning for _, meaning in words),
+        b"".join(pinyins),
+        array("I", first_codes).tobytes(),
+        array("I", first_starts).tobytes(),
+    ]
+
+    offsets = []
+    position = HEADER.size
+    for section in sections:
+        # Align sections for the arrays
+        position += -position % 4
+        offsets.append(position)
+        position += len(section)
+
+    with open(path, "wb") as index_file:
+        index_file.write(HEADER.pack(MAGIC, len(words), len(codes), len(first_codes), *offsets))
+        for offset, section in zip(offsets, sections):
+            index_file.write(b"\0" * (offset - index_file.tell()))
+            index_file.write(section)
+
+
+class _Blob:
+    """Sequence of the byte strings stored in a section of a buffer."""
+
+    def __init__(self, buffer, start, offsets):
+        self.buffer = buffer
+        self.start = start
+        self.offsets = offsets
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index):
+        return self.buffer[self.start + self.offsets[index]:self.start + self.offsets[index + 1]]
+
+
+class CedictIndex:
+    """Reads the dictionary and pinyin table from an index compiled with
+    build_index. The file is memory-mapped so loading is nearly free and
+    its pages are shared between processes."""
+
+    def __init__(self, path):
+        with open(path, "rb") as index_file:
+            self.buffer = mmap.mmap(index_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, word_count, char_count, first_count, *offsets = HEADER.unpack_from(self.buffer)
+        if magic != MAGIC:
+            raise ValueError("%s is not a compiled CEDICT index" % path)
+
+        def uint32s(index, count):
+            return memoryview(self.buffer)[offsets[index]:offsets[index] + 4 * count].cast("I")
+
+        self.codes = uint32s(2, char_count)
+        self.words = _Blob(self.buffer, offsets[4], uint32s(0, word_count + 1))
+        self.meanings = _Blob(self.buffer, offsets[5], uint32s(1, word_count + 1))
+        self.pinyins = _Blob(self.buffer, offsets[6], uint32s(3, char_count + 1))
+        self.first_codes = uint32s(7, first_count)
+        self.first_starts = uint32s(8, first_count + 1)
+
+    def _word_range(self, char):
+        """Returns the range of the indices of the words starting with char."""
+        code = ord(char)
+        index = bisect_left(self.first_codes, code)
+        if index < len(self.first_codes) and self.first_codes[index] == code:
+            return self.first_starts[index], self.first_starts[index + 1]
+        return 0, 0
+
+    def _find(self, word, lo, hi):
+        """Returns the index of the first word in [lo, hi) that is not smaller
+        than the word and whether that word starts with the given word."""
+        index = bisect_left(self.words, word, lo, hi)
+        found = index < hi and self.words[index].startswith(word)
+        return index, found
+
+    def _meanings(self, index):
+        return self.meanings[index].decode("utf-8").split("/")
+
+    def translate_word(self, word):
+        """Returns the translations of a word or None."""
+        if len(word) == 0:
+            return None
+        lo, hi = self._word_range(word[0])
+        word = word.encode("utf-8")
+        index, found = self._find(word, lo, hi)
+        if found and self.words[index] == word:
+            return self._meanings(index)
+        return None
+
+    def all_phrase_translations(self, text):
+        """Returns [word, translations] for all dictionary words
+        that appear in the text, ordered by their position."""
+        results = []
+        for start in range(len(text)):
+            # Longer words can only come after the shorter words they start with
+            index, hi = self._word_range(text[start])
+            for end in range(start + 1, len(text) + 1):
+                word = text[start:end].encode("utf-8")
+                index, found = self._find(word, index, hi)
+                if not found:
+                    break
+                if self.words[index] == word:
+                    results.append([text[start:end], self._meanings(index)])
+        return results
+
+    def get_pinyin(self, text):
+        """Returns the pinyin for the given chinese text, other characters are kept."""
+        parts = []
+        for char in text:
+            code = ord(char)
+            index = bisect_left(self.codes, code)
+            if index < len(self.codes) and self.codes[index] == code:
+                parts.append(self.pinyins[index].decode("utf-8"))
+            else:
+                parts.append(unicodedata.normalize("NFC", char))
+        return "".join(parts)
+
+
+@click.command()
+@click.argument("path", type=click.Path(dir_okay=False), default=os.path.join("data", "cedict.idx"))
+def main(path):
+    """Compiles the dictionary index to PATH."""
+    build_index(path)
+    print("Wrote", path)
+
+
+if __name__ == "__main__":
+    main()
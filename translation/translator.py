@@ -0,0 +1,144 @@
+import time
+from functools import partial
+from threading import Lock
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait
+
+
+class TranslatorBackend:
+    """Interface of machine translation backends."""
+
+    def translate_batch(self, texts):
+        """Returns the translations of a list of texts."""
+        raise NotImplementedError()
+
+
+class GoogleTranslatorBackend(TranslatorBackend):
+    """Translates using googletrans. A batch is sent as a single request
+    with one text per line."""
+
+    def __init__(self, src_lang="zh-CN", dst_lang="en"):
+        from googletrans import Translator as GoogleTranslator
+        self.translator = GoogleTranslator()
+        self.src_lang = src_lang
+        self.dst_lang = dst_lang
+
+    def translate_batch(self, texts):
+        texts = [text.replace("\n", " ") for text in texts]
+        translation = self.translator.translate(
+            "\n".join(texts), src=self.src_lang, dest=self.dst_lang).text
+        translations = translation.split("\n")
+
+        # Translate separately if the lines got merged or split
+        if len(translations) != len(texts):
+            translations = [
+                t.text for t in self.translator.translate(texts, src=self.src_lang, dest=self.dst_lang)
+            ]
+        return translations
+
+
+class LocalTranslatorBackend(TranslatorBackend):
+    """Offline stand-in that returns the texts unchanged after simulating
+    the latency of a request with a base latency and a latency per text."""
+
+    def __init__(self, latency=0.2, latency_per_text=0.01):
+        self.latency = latency
+        self.latency_per_text = latency_per_text
+
+    def translate_batch(self, texts):
+        time.sleep(self.latency + self.latency_per_text * len(texts))
+        return list(texts)
+
+
+class BatchTranslator:
+    """Translates texts using a backend. All uncached texts of a call
+    are sent in batches of up to max_batch_size that run concurrently.
+    Translations that take longer than the timeout are returned as None
+    but cached once they arrive. Texts whose request is still running are
+    not requested again but wait for that request. Keeps up to max_entries
+    translations and evicts the least recently used ones."""
+
+    def __init__(self, backend, max_entries=1024, max_batch_size=32, workers=4, timeout=5):
+        self.backend = backend
+        self.max_entries = max_entries
+        self.max_batch_size = max_batch_size
+        self.timeout = timeout
+        self.executor = ThreadPoolExecutor(workers)
+        self.entries = OrderedDict()
+        # Texts of running requests and the future and texts of their request
+        self.pending = {}
+        self.lock = Lock()
+
+    def _get(self, text):
+        with self.lock:
+            translation = self.entries.get(text)
+            if translation is not None:
+                self.entries.move_to_end(text)
+            return translation
+
+    def _put(self, texts, translations):
+        with self.lock:
+            for text, translation in zip(texts, translations):
+                self.entries[text] = translation
+                self.entries.move_to_end(text)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def _translate_batch(self, texts):
+        translations = self.backend.translate_batch(texts)
+        self._put(texts, translations)
+        return translations
+
+    def _finish(self, texts, future):
+        with self.lock:
+            for text in texts:
+                if self.pending.get(text, (None,))[0] is future:
+                    del self.pending[text]
+
+    def _request(self, texts):
+        """Returns the futures of the requests translating the texts
+        and the texts of every request. Only texts without a running
+        request are sent."""
+        requests = {}
+        with self.lock:
+            new_texts = []
+            for text in texts:
+                if text in self.pending:
+                    future, batch = self.pending[text]
+                    requests[future] = batch
+                else:
+                    new_texts.append(text)
+
+            for start in range(0, len(new_texts), self.max_batch_size):
+                batch = new_texts[start:start + self.max_batch_size]
+                future = self.executor.submit(self._translate_batch, batch)
+                requests[future] = batch
+                for text in batch:
+                    self.pending[text] = (future, batch)
+
+        # Added outside of the lock as callbacks of finished futures run right away
+        for future, batch in requests.items():
+            future.add_done_callback(partial(self._finish, batch))
+        return requests
+
+    def translate_all(self, texts):
+        """Returns the translations of all texts in order,
+        None for texts that failed or timed out."""
+        translations = {text: self._get(text) for text in texts}
+
+        uncached = [text for text, translation in translations.items() if translation is None]
+        futures = self._request(uncached)
+        done, _ = wait(futures, timeout=self.timeout)
+
+        for future in done:
+            if future.exception() is not None:
+                print("Translation failed:", future.exception())
+                continue
+            translations.update(
+                (text, translation) for text, translation in zip(futures[future], future.result())
+                if text in translations)
+
+        return [translations[text] for text in texts]
+
+    def __call__(self, text):
+        return self.translate_all([text])[0]
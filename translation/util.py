@@ -1,9 +1,25 @@
+import os
 import re
-from functools import lru_cache
+
+_cedict_index = None
+
+
+def use_cedict_index(path):
+    """Makes the dictionary lookups use the compiled index at the path
+    instead of parsing the dictionary of the pinyin package.
+    Returns whether the index exists."""
+    global _cedict_index
+    if not os.path.exists(path):
+        return False
+    from .cedict_index import CedictIndex
+    _cedict_index = CedictIndex(path)
+    return True
 
 
 def get_pinyin(text):
     """Returns the pinyin for the given chinese text."""
+    if _cedict_index is not None:
+        return _cedict_index.get_pinyin(text)
     import pinyin
     return pinyin.get(text)
 
@@ -11,22 +27,32 @@ def get_pinyin(text):
 def get_all_phrase_translations(text):
     """Returns the dictionary translation for all possible
     phrase combinations in the given chinese text."""
+    if _cedict_index is not None:
+        return _cedict_index.all_phrase_translations(text)
     import pinyin.cedict
     return pinyin.cedict.all_phrase_translations(text)
 
 
-def get_translate_fn(src_lang="zh-CN", dst_lang="en"):
-    """Returns a function that google-translates text from a
-    source to a target language. This implementation also caches
-    its results."""
-    from googletrans import Translator as GoogleTranslator
-    translator = GoogleTranslator()
+def get_sentence_translation(text):
+    """Returns the pinyin and a text with the dictionary translations
+    of all phrases for the given chinese text."""
+    pinyin_text = get_pinyin(text)
+    translations = get_all_phrase_translations(text)
+    translation_text = "\n".join(
+        ["%s (%s): %s" % (t[0], get_pinyin(t[0]), ", ".join(t[1])) for t in translations])
+    return pinyin_text, translation_text
 
-    @lru_cache(maxsize=None)
-    def google_translate(text):
-        return translator.translate(text, src=src_lang, dest=dst_lang).text
 
-    return google_translate
+def get_translate_fn(src_lang="zh-CN", dst_lang="en", backend=None):
+    """Returns a function that google-translates text from a
+    source to a target language. The function also has a translate_all
+    method for translating many texts in batches. This implementation
+    also caches its results. Another backend can be passed instead
+    of google translate."""
+    from .translator import BatchTranslator, GoogleTranslatorBackend
+    if backend is None:
+        backend = GoogleTranslatorBackend(src_lang, dst_lang)
+    return BatchTranslator(backend)
 
 
 def contains_chinese(text):
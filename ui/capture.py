@@ -0,0 +1,52 @@
+import cv2
+import numpy as np
+
+
+class FrameRing:
+    """Preallocated frame buffers that are handed out in turn.
+    A frame stays valid until size more frames were handed out."""
+
+    def __init__(self, size=3):
+        self.size = size
+        self.frames = []
+        self.index = 0
+
+    def next(self, shape):
+        """Returns the next frame buffer, reallocating all buffers if the shape changed."""
+        if len(self.frames) == 0 or self.frames[0].shape != shape:
+            self.frames = [np.empty(shape, np.uint8) for _ in range(self.size)]
+            self.index = 0
+        frame = self.frames[self.index]
+        self.index = (self.index + 1) % self.size
+        return frame
+
+
+class ScreenCapture:
+    """Captures monitor areas with mss into the RGB frames of a ring buffer.
+    The BGRA screenshot is only read through a view and downscaling and
+    reordering the channels write directly into preallocated buffers, so
+    the only full-resolution pass over a frame is reading it."""
+
+    def __init__(self, sct, max_height=None, ring_size=3):
+        self.sct = sct
+        self.max_height = max_height
+        self.ring = FrameRing(ring_size)
+        self.scaled = None
+
+    def grab(self, monitor):
+        """Captures the monitor area and returns the RGB frame
+        and the shape (height, width) of the captured area."""
+        shot = self.sct.grab(monitor)
+        bgra = np.frombuffer(shot.raw, np.uint8).reshape(shot.height, shot.width, 4)
+        h, w = bgra.shape[:2]
+
+        if self.max_height is not None and h > self.max_height:
+            size = (int(w * self.max_height / h), self.max_height)
+            if self.scaled is None or self.scaled.shape[:2] != size[::-1]:
+                self.scaled = np.empty((size[1], size[0], 4), np.uint8)
+            cv2.resize(bgra, size, dst=self.scaled, interpolation=cv2.INTER_AREA)
+            bgra = self.scaled
+
+        frame = self.ring.next(bgra.shape[:2] + (3,))
+        cv2.cvtColor(bgra, cv2.COLOR_BGRA2RGB, dst=frame)
+        return frame, (h, w)